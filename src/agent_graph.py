@@ -14,6 +14,8 @@ from src.chatbot import get_chatbot
 from src.mqim import get_mqim
 from src.ueba import get_ueba
 from src.database import get_database
+from src.localization import resolve_language
+from src.speech import get_speech_cache
 
 # --- 1. DEFINE THE SHARED STATE (The Clipboard) ---
 # This is the data that gets passed around between agents.
@@ -26,6 +28,7 @@ class AgentState(TypedDict):
     mqim_notification: dict  # New: Manufacturing feedback
     security_threat: dict     # New: Security status
     user_id: str             # New: User performing the action
+    language: str            # New: Customer's language for alerts and voice
 
 # --- 2. DEFINE THE NODES (The Agents) ---
 
@@ -79,18 +82,61 @@ def customer_service_agent(state: AgentState):
     owner = fetch_owner_details(vehicle_id)
     owner_name = owner.get('name', 'Valued Customer') if owner else 'Valued Customer'
     
-    # Generate personalized alert using chatbot
-    alert_msg = chatbot.generate_initial_alert(
-        diagnosis_report=state['diagnosis_report'],
-        vehicle_id=vehicle_id,
-        owner_name=owner_name
-    )
+    language = resolve_language(state.get('language'))
+    
+    # Template alert: a single run must not wait on the LLM (sweep_fleet_alerts rewrites in bulk)
+    alert_msg = chatbot.generate_initial_alert(state['diagnosis_report'], vehicle_id, owner_name, language)
+    
+    # Start the voice clip now (background workers) so the chat tab finds it ready
+    if state['severity'] in ("Critical", "High"):
+        get_speech_cache().prefetch(alert_msg, language)
     
     # Save conversation to database
     db = get_database()
     db.save_message(vehicle_id, "assistant", alert_msg, {"severity": state['severity']})
     
-    return {"messages": [alert_msg]}
+    # The chat tab opens with (and speaks) exactly this text, so it hits the prefetched clip
+    return {"messages": [alert_msg], "language": language}
+
+def sweep_fleet_alerts(vehicles: list, language: str = None) -> dict:
+    """
+    Fleet sweep: diagnose every vehicle and alert the owners of the
+    High/Critical ones, generating all alert messages concurrently.
+    
+    Takes raw vehicles.json records and returns {vehicle_id: alert message}.
+    Alerts (and their voice clips) use the record's 'language' when it has
+    one, otherwise `language`.
+    """
+    pending = []
+    for vehicle in vehicles:
+        report = analyze_vehicle(vehicle)
+        if report['status'] in ("Critical", "High"):
+            pending.append({
+                "diagnosis_report": report,
+                "vehicle_id": vehicle['vehicle_id'],
+                "owner_name": vehicle.get('owner_name', 'Valued Customer'),
+                "language": resolve_language(vehicle.get('language') or language)
+            })
+    
+    print(f"[Customer Service Agent] Sweep found {len(pending)} vehicles needing alerts...")
+    messages = get_chatbot().generate_alerts(pending)
+    
+    # Voice clips for the most severe first; the cache stops accepting at its prefetch budget
+    speech = get_speech_cache()
+    queued = 0
+    by_severity = sorted(zip(pending, messages), key=lambda pair: pair[0]['diagnosis_report']['status'] != "Critical")
+    for alert, alert_msg in by_severity:
+        if queued >= speech.max_prefetch:
+            break
+        queued += speech.prefetch(alert_msg, alert['language'])
+    print(f"[Customer Service Agent] Queued {queued} voice clips for prefetch")
+    
+    get_database().save_messages(
+        (alert['vehicle_id'], "assistant", alert_msg, {"severity": alert['diagnosis_report']['status']})
+        for alert, alert_msg in zip(pending, messages)
+    )
+    
+    return {alert['vehicle_id']: alert_msg for alert, alert_msg in zip(pending, messages)}
 
 def mqim_agent(state: AgentState):
     """
@@ -0,0 +1,212 @@
+"""
+Alert Renderer
+Bulk rendering of customer alert messages from precompiled templates
+"""
+
+import json
+import os
+import re
+import sys
+from itertools import repeat
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.localization import (
+    ALERT_BODIES, ALERT_GREETINGS, DEFAULT_RECOMMENDATION, NO_ISSUES_TEXT, resolve_language
+)
+
+ISSUE_BULLET = "• "
+
+TEMPLATE_SLOTS = ('owner_name', 'vehicle_id', 'issues_text', 'recommendation')
+_SLOT = re.compile(r"\{(\w+)\}")
+
+ColumnOrScalar = Union[str, Sequence[str]]
+
+
+def compile_template(template: str) -> Callable[[str, str, str, str], str]:
+    """
+    Compile a "{slot}" template into a function of TEMPLATE_SLOTS (in that order)
+    
+    The template is split into literal text and slot references once, and a
+    function returning "".join((literal, slot, literal, ...)) is generated,
+    so rendering costs about as much as an f-string whatever the slot order.
+    """
+    parts = _SLOT.split(template)
+    pieces = []
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            if part:
+                pieces.append(repr(part))
+        elif part in TEMPLATE_SLOTS:
+            pieces.append(part)
+        else:
+            raise ValueError(f"Unknown template slot '{{{part}}}'")
+    source = f"lambda {', '.join(TEMPLATE_SLOTS)}: ''.join(({', '.join(pieces)},))"
+    return eval(compile(source, "<alert template>", "eval"), {})
+
+
+def _column(value: ColumnOrScalar, n: int) -> Iterable[str]:
+    """Broadcast a scalar to n rows; pass sequences through"""
+    return repeat(value, n) if isinstance(value, str) else value
+
+
+class AlertRenderer:
+    """
+    Renders alert messages for one language.
+    
+    The greeting is folded into the body once per severity tier and each
+    tier's template is compiled into a join of literals and slots, so one
+    alert is a single call. The bulleted issue block is memoized per
+    distinct issue list, which is what makes a fleet-wide event (a recall,
+    where every vehicle shares the same issue) cheap.
+    """
+    
+    MAX_CACHED_ISSUE_LISTS = 10_000
+    
+    def __init__(self, language: str = 'en'):
+        if language not in ALERT_BODIES:
+            raise ValueError(f"No alert templates for language '{language}'")
+        self.language = language
+        body = ALERT_BODIES[language]
+        self._templates = {
+            tier: compile_template(body.replace("{greeting}", greeting))
+            for tier, greeting in ALERT_GREETINGS[language].items()
+        }
+        self._no_issues = NO_ISSUES_TEXT[language]
+        self._default_recommendation = DEFAULT_RECOMMENDATION[language]
+        self._issue_text: Dict[Tuple[str, ...], str] = {}
+        self._metadata_json: Dict[str, str] = {}
+    
+    def _issues_text(self, issues: Optional[Sequence[str]]) -> str:
+        if not issues:
+            return self._no_issues
+        key = tuple(issues)
+        text = self._issue_text.get(key)
+        if text is None:
+            text = "\n".join(ISSUE_BULLET + issue for issue in key)
+            if len(self._issue_text) < self.MAX_CACHED_ISSUE_LISTS:
+                self._issue_text[key] = text
+        return text
+    
+    def render(self, severity: str, vehicle_id: str, owner_name: str,
+               issues: Optional[Sequence[str]] = None, recommendation: Optional[str] = None) -> str:
+        """One alert message"""
+        template = self._templates.get(severity) or self._templates['default']
+        return template(owner_name, vehicle_id, self._issues_text(issues),
+                        recommendation or self._default_recommendation)
+    
+    def render_batch(self, vehicle_ids: Sequence[str], owner_names: ColumnOrScalar,
+                     issues: Sequence[Sequence[str]], severities: ColumnOrScalar = 'Critical',
+                     recommendations: Optional[ColumnOrScalar] = None) -> Iterator[str]:
+        """
+        Alert messages for columnar inputs, generated lazily in row order
+        
+        severities and recommendations may be a single value for every row.
+        """
+        n = len(vehicle_ids)
+        templates, default = self._templates, self._templates['default']
+        default_recommendation = self._default_recommendation
+        last_issues, last_text = object(), None  # Sentinel: the first row always looks up
+        
+        for vehicle_id, owner_name, row_issues, severity, recommendation in zip(
+            vehicle_ids, _column(owner_names, n), issues, _column(severities, n),
+            _column(recommendations or default_recommendation, n)
+        ):
+            # Rows usually share one issue list object in a recall; skip the memo lookup then
+            if row_issues is not last_issues:
+                last_issues, last_text = row_issues, self._issues_text(row_issues)
+            yield (templates.get(severity) or default)(
+                owner_name, vehicle_id, last_text, recommendation or default_recommendation
+            )
+    
+    def render_rows(self, vehicle_ids: Sequence[str], owner_names: ColumnOrScalar,
+                    issues: Sequence[Sequence[str]], severities: ColumnOrScalar = 'Critical',
+                    recommendations: Optional[ColumnOrScalar] = None) -> Iterator[Tuple[str, str, str, str]]:
+        """(vehicle_id, role, message, metadata JSON) rows ready for Database.save_messages"""
+        n = len(vehicle_ids)
+        messages = self.render_batch(vehicle_ids, owner_names, issues, severities, recommendations)
+        for vehicle_id, severity, message in zip(vehicle_ids, _column(severities, n), messages):
+            metadata = self._metadata_json.get(severity)
+            if metadata is None:
+                metadata = self._metadata_json[severity] = json.dumps({"severity": severity})
+            yield vehicle_id, "assistant", message, metadata
+
+
+def send_bulk_alerts(vehicle_ids: Sequence[str], owner_names: ColumnOrScalar,
+                     issues: Sequence[Sequence[str]], severities: ColumnOrScalar = 'Critical',
+                     recommendations: Optional[ColumnOrScalar] = None,
+                     language: str = 'en', database=None) -> int:
+    """Render alerts for a whole batch and stream them into the conversations table"""
+    if database is None:
+        from src.database import get_database
+        database = get_database()
+    rows = get_alert_renderer(language).render_rows(vehicle_ids, owner_names, issues, severities, recommendations)
+    return database.save_messages(rows)
+
+
+# Renderer instances, one per language
+_renderer_instances: Dict[str, AlertRenderer] = {}
+
+def get_alert_renderer(language: str = 'en') -> AlertRenderer:
+    """Get or create the alert renderer for a language (unsupported languages get English)"""
+    language = resolve_language(language)
+    renderer = _renderer_instances.get(language)
+    if renderer is None:
+        renderer = _renderer_instances[language] = AlertRenderer(language)
+    return renderer
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import tempfile
+    import time
+    
+    from src.chatbot import CustomerServiceBot
+    from src.conversations import ConversationManager
+    from src.database import Database
+    
+    n_alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"=== RECALL ALERT BENCHMARK: {n_alerts:,} alerts ===")
+    
+    vehicle_ids = [f"V-{i:06d}" for i in range(n_alerts)]
+    owner_names = [f"Owner {i}" for i in range(n_alerts)]
+    issues = [["Brake caliper recall: inspection required"]] * n_alerts
+    recommendation = "Book a free recall inspection at your nearest service center"
+    report = {'status': 'Critical', 'issues': issues[0], 'recommendation': recommendation}
+    
+    # Per-alert path: generate_initial_alert + save_message, one connection and commit each
+    bot = CustomerServiceBot(conversations=ConversationManager(persist=False))
+    sample = min(n_alerts, 1000)
+    db = Database(os.path.join(tempfile.mkdtemp(), 'per_alert.db'))
+    start = time.perf_counter()
+    for i in range(sample):
+        message = bot.generate_initial_alert(report, vehicle_ids[i], owner_names[i])
+        db.save_message(vehicle_ids[i], "assistant", message, {"severity": "Critical"})
+    per_alert_secs = (time.perf_counter() - start) / sample * n_alerts
+    
+    start = time.perf_counter()
+    for i in range(n_alerts):
+        bot.generate_initial_alert(report, vehicle_ids[i], owner_names[i])
+    render_only_secs = time.perf_counter() - start
+    
+    # Batch path: columnar render streamed into one executemany transaction
+    renderer = AlertRenderer()
+    start = time.perf_counter()
+    for _ in renderer.render_batch(vehicle_ids, owner_names, issues, 'Critical', recommendation):
+        pass
+    batch_render_secs = time.perf_counter() - start
+    
+    db = Database(os.path.join(tempfile.mkdtemp(), 'bulk.db'))
+    start = time.perf_counter()
+    written = send_bulk_alerts(vehicle_ids, owner_names, issues, 'Critical', recommendation, database=db)
+    bulk_secs = time.perf_counter() - start
+    
+    assert written == n_alerts
+    assert renderer.render('Critical', vehicle_ids[0], owner_names[0], issues[0], recommendation) == \
+        bot.generate_initial_alert(report, vehicle_ids[0], owner_names[0])
+    
+    print(f"Render only     : per-alert {render_only_secs:6.2f}s   batch {batch_render_secs:6.2f}s  "
+          f"({render_only_secs / batch_render_secs:.1f}x)")
+    print(f"Render + store  : per-alert {per_alert_secs:6.2f}s   bulk  {bulk_secs:6.2f}s  "
+          f"({per_alert_secs / bulk_secs:.0f}x, {n_alerts / bulk_secs:,.0f} alerts/s; per-alert estimated from {sample:,})")
@@ -4,7 +4,21 @@ Handles conversations with vehicle owners about diagnostics and service booking.
 """
 
 import os
-from typing import List, Dict
+import re
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Optional, Iterator
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.conversations import ConversationManager, get_conversation_manager
+from src.response_cache import ResponseCache, get_response_cache
+from src.llm_pool import LLMPool, get_llm_pool
+from src.intents import get_intent_classifier
+from src.alerts import get_alert_renderer
+from src.localization import SUPPORTED_LANGUAGES, fallback_reply, resolve_language
 
 # Check if OpenAI is available, otherwise use a fallback
 try:
@@ -13,6 +27,53 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+_TOKEN_PATTERN = re.compile(r"\s*\S+\s*|\s+")
+
+
+def chunk_text(text: str) -> Iterator[str]:
+    """Split a finished reply into word-sized chunks that concatenate back to the original"""
+    for match in _TOKEN_PATTERN.finditer(text):
+        yield match.group(0)
+
+
+class StubChatClient:
+    """
+    Offline stand-in for the OpenAI client (client.chat.completions.create)
+
+    Sleeps `latency` seconds per call to mimic a network round trip and
+    counts calls, so caching and batching can be measured without an API key.
+    """
+    
+    def __init__(self, latency: float = 0.0, reply: str = "Stub reply to: {message}",
+                 token_latency: float = 0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.reply = reply
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    def _create(self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        text = self.reply.format(message=last_user)
+        if stream:
+            return self._stream(text)
+        if self.latency:
+            time.sleep(self.latency + self.token_latency * len(list(chunk_text(text))))
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    
+    def _stream(self, text: str):
+        """Yield chunks shaped like the OpenAI streaming API (choices[0].delta.content)"""
+        if self.latency:
+            time.sleep(self.latency)
+        for token in chunk_text(text):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
 
 class CustomerServiceBot:
     """
@@ -20,168 +81,242 @@ class CustomerServiceBot:
     Uses GPT-4 if available, otherwise falls back to rule-based responses.
     """
     
-    def __init__(self):
-        self.conversation_history: List[Dict[str, str]] = []
+    DEFAULT_SESSION = "default"
+    LLM_CONTEXT_MESSAGES = 10  # Most recent messages sent with each LLM request
+    
+    def __init__(self, conversations: Optional[ConversationManager] = None, client=None,
+                 cache: Optional[ResponseCache] = None, pool: Optional[LLMPool] = None):
+        # Histories are kept per (session, vehicle) so concurrent customers don't share context
+        self.conversations = conversations or get_conversation_manager()
         
-        if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
+        if client is not None:
+            self.client = client
+            self.use_llm = True
+        elif OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
             self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             self.use_llm = True
         else:
             self.client = None
             self.use_llm = False
             print("[Chatbot] Running in fallback mode (no OpenAI API key found)")
+        
+        # Replies to repeated questions in the same diagnostic context are reused (pass ResponseCache(max_entries=0) to disable)
+        self.cache = cache if cache is not None else (get_response_cache() if self.use_llm else None)
+        
+        # Alerts for a fleet sweep go through a shared async pool rather than the blocking client
+        self.pool = pool or get_llm_pool()
     
-    def generate_initial_alert(self, diagnosis_report: dict, vehicle_id: str, owner_name: str) -> str:
+    def generate_initial_alert(self, diagnosis_report: dict, vehicle_id: str, owner_name: str,
+                               language: str = 'en') -> str:
         """
         Generates the initial alert message sent to the customer.
         """
-        severity = diagnosis_report.get('status', 'Unknown')
-        issues = diagnosis_report.get('issues', [])
-        recommendation = diagnosis_report.get('recommendation', 'Please contact service.')
-        
-        if severity == "Critical":
-            urgency = "URGENT"
-            greeting = f"⚠️ CRITICAL ALERT for {owner_name}"
-        elif severity == "High":
-            urgency = "IMPORTANT"
-            greeting = f"⚠️ Important Notice for {owner_name}"
-        else:
-            urgency = "NOTICE"
-            greeting = f"Hello {owner_name}"
-        
-        issues_text = "\n".join([f"• {issue}" for issue in issues]) if issues else "General maintenance required"
-        
-        message = f"""{greeting},
-
-We've detected the following issue(s) with your vehicle ({vehicle_id}):
-
-{issues_text}
-
-Recommendation: {recommendation}
-
-Please reply to schedule a service appointment or if you have any questions.
-
-- AutoGuard Support Team"""
+        return get_alert_renderer(language).render(
+            diagnosis_report.get('status', 'Unknown'),
+            vehicle_id,
+            owner_name,
+            diagnosis_report.get('issues', []),
+            diagnosis_report.get('recommendation')
+        )
+    
+    def generate_alerts(self, alerts: List[Dict], timeout: float = None) -> List[str]:
+        """
+        Personalized alert messages for many vehicles at once.
         
-        return message
+        Each entry needs diagnosis_report, vehicle_id and owner_name, and
+        may set language. The template alert is drafted first; when an LLM
+        is available the pool rewrites all of them concurrently, and any call
+        that misses its deadline (or fails) keeps the template text.
+        """
+        jobs = []
+        for alert in alerts:
+            language = resolve_language(alert.get('language'))
+            template = self.generate_initial_alert(alert['diagnosis_report'], alert['vehicle_id'],
+                                                   alert['owner_name'], language)
+            messages = [
+                {"role": "system", "content": ("You are a customer service agent for AutoGuard. Rewrite the vehicle alert "
+                                               "below so it is warm, clear and concise. Keep every fact, the vehicle ID "
+                                               "and the recommendation. Do not invent appointment times. "
+                                               f"Write in {SUPPORTED_LANGUAGES[language]}.")},
+                {"role": "user", "content": template}
+            ]
+            jobs.append((messages, lambda template=template: template))
+        return self.pool.complete_many(jobs, timeout)
     
-    def chat(self, user_message: str, context: dict = None) -> str:
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """History of the default session's unknown-vehicle conversation (kept for older callers)"""
+        return self.conversations.history(self.DEFAULT_SESSION, "Unknown")
+    
+    def chat(self, user_message: str, context: dict = None, session_id: str = DEFAULT_SESSION) -> str:
         """
         Generate a response to the user's message.
         
         Args:
             user_message: The user's input message
             context: Additional context (vehicle info, diagnosis, etc.)
+            session_id: Caller's session (e.g. one per dashboard browser session)
         
         Returns:
             Bot's response message
         """
+        vehicle_id = (context or {}).get('vehicle_id', 'Unknown')
+        
         # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
+        self.conversations.append(session_id, vehicle_id, "user", user_message)
         
         if self.use_llm:
-            response = self._generate_llm_response(user_message, context)
+            history = self.conversations.history(session_id, vehicle_id, self.LLM_CONTEXT_MESSAGES)
+            summary = self.conversations.summary(session_id, vehicle_id)
+            response = self._generate_llm_response(user_message, context, history, summary)
         else:
             response = self._generate_fallback_response(user_message, context)
         
         # Add bot response to history
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": response
-        })
+        self.conversations.append(session_id, vehicle_id, "assistant", response)
         
         return response
     
-    def _generate_llm_response(self, user_message: str, context: dict) -> str:
-        """Generate response using OpenAI GPT."""
+    def chat_stream(self, user_message: str, context: dict = None,
+                    session_id: str = DEFAULT_SESSION) -> Iterator[str]:
+        """
+        Like chat(), but yields the reply in chunks as they are produced.
+        
+        LLM replies are streamed token by token; cached and rule-based replies
+        are split into words. The full reply is added to the conversation once
+        the stream ends (or whatever was produced, if the caller stops early).
+        """
+        vehicle_id = (context or {}).get('vehicle_id', 'Unknown')
+        self.conversations.append(session_id, vehicle_id, "user", user_message)
+        
+        parts: List[str] = []
         try:
-            # Build system prompt with context
-            system_prompt = """You are a helpful customer service agent for AutoGuard, an automotive fleet management company.
+            if self.use_llm:
+                history = self.conversations.history(session_id, vehicle_id, self.LLM_CONTEXT_MESSAGES)
+                summary = self.conversations.summary(session_id, vehicle_id)
+                tokens = self._stream_llm_response(user_message, context, history, summary)
+            else:
+                tokens = chunk_text(self._generate_fallback_response(user_message, context))
+            for token in tokens:
+                parts.append(token)
+                yield token
+        finally:
+            if parts:
+                self.conversations.append(session_id, vehicle_id, "assistant", "".join(parts).strip())
+    
+    def _build_llm_messages(self, user_message: str, context: dict, history: List[Dict[str, str]] = None,
+                            summary: Optional[str] = None) -> List[Dict[str, str]]:
+        """System prompt with vehicle context and the summary of older turns, followed by the recent conversation"""
+        system_prompt = """You are a helpful customer service agent for AutoGuard, an automotive fleet management company.
 You help vehicle owners understand diagnostic issues and schedule service appointments.
 
 Be professional, empathetic, and concise. Always prioritize safety.
 If asked to schedule service, confirm the booking and provide a time slot.
 """
+
+        if context:
+            vehicle_id = context.get('vehicle_id', 'Unknown')
+            diagnosis = context.get('diagnosis_report', {})
+            severity = diagnosis.get('status', 'Normal')
             
-            if context:
-                vehicle_id = context.get('vehicle_id', 'Unknown')
-                diagnosis = context.get('diagnosis_report', {})
-                severity = diagnosis.get('status', 'Normal')
-                
-                system_prompt += f"\n\nCurrent Context:\n- Vehicle ID: {vehicle_id}\n- Severity: {severity}"
-                
-                if diagnosis.get('issues'):
-                    system_prompt += f"\n- Issues: {', '.join(diagnosis['issues'])}"
+            system_prompt += f"\n\nCurrent Context:\n- Vehicle ID: {vehicle_id}\n- Severity: {severity}"
             
-            messages = [{"role": "system", "content": system_prompt}]
-            messages.extend(self.conversation_history[-10:])  # Last 10 messages for context
+            if diagnosis.get('issues'):
+                system_prompt += f"\n- Issues: {', '.join(diagnosis['issues'])}"
             
+            language = resolve_language(context.get('language'))
+            if language != 'en':
+                system_prompt += f"\n\nAlways reply in {SUPPORTED_LANGUAGES[language]}."
+        
+        if summary:
+            system_prompt += f"\n\nEarlier in this conversation:\n{summary}"
+        
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(history or [{"role": "user", "content": user_message}])
+        return messages
+    
+    def _stream_llm_response(self, user_message: str, context: dict, history: List[Dict[str, str]] = None,
+                             summary: Optional[str] = None) -> Iterator[str]:
+        """Stream tokens from OpenAI GPT, falling back to the rule-based reply if nothing arrives"""
+        if self.cache is not None:
+            cached = self.cache.get(user_message, context, history, summary)
+            if cached is not None:
+                yield from chunk_text(cached)
+                return
+        
+        parts: List[str] = []
+        try:
+            stream = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=self._build_llm_messages(user_message, context, history, summary),
+                temperature=0.7,
+                max_tokens=200,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    parts.append(token)
+                    yield token
+        except Exception as e:
+            print(f"[Chatbot] LLM Error: {e}")
+            if not parts:
+                yield from chunk_text(self._generate_fallback_response(user_message, context))
+            return
+        
+        if self.cache is not None and parts:
+            self.cache.put(user_message, context, "".join(parts).strip(), history, summary)
+    
+    def _generate_llm_response(self, user_message: str, context: dict, history: List[Dict[str, str]] = None,
+                               summary: Optional[str] = None) -> str:
+        """Generate response using OpenAI GPT."""
+        if self.cache is not None:
+            cached = self.cache.get(user_message, context, history, summary)
+            if cached is not None:
+                return cached
+        
+        try:
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=messages,
+                messages=self._build_llm_messages(user_message, context, history, summary),
                 temperature=0.7,
                 max_tokens=200
             )
             
-            return response.choices[0].message.content.strip()
-            
+            reply = response.choices[0].message.content.strip()
+            if self.cache is not None:
+                self.cache.put(user_message, context, reply, history, summary)
+            return reply
+        
         except Exception as e:
             print(f"[Chatbot] LLM Error: {e}")
             return self._generate_fallback_response(user_message, context)
     
     def _generate_fallback_response(self, user_message: str, context: dict) -> str:
         """Generate rule-based response when LLM is unavailable."""
-        msg_lower = user_message.lower()
-        
-        # Service booking keywords
-        if any(word in msg_lower for word in ['book', 'schedule', 'appointment', 'service', 'fix']):
-            return ("I've scheduled a service appointment for you tomorrow at 10:00 AM. "
-                   "You'll receive a confirmation SMS shortly. Is there anything else I can help with?")
+        language = resolve_language((context or {}).get('language'))
+        intent = get_intent_classifier(language).classify(user_message)
+        diagnosis = (context or {}).get('diagnosis_report') or {}
         
         # Question about issue
-        elif any(word in msg_lower for word in ['what', 'why', 'how', 'explain', 'issue', 'problem']):
-            if context and context.get('diagnosis_report'):
-                issues = context['diagnosis_report'].get('issues', [])
-                if issues:
-                    return (f"The diagnostic system detected: {issues[0]}. "
-                           f"This requires immediate attention to ensure your safety. "
-                           f"Would you like me to schedule a service appointment?")
-            return "Our diagnostic system has flagged a potential issue with your vehicle. I recommend scheduling a service check. Would you like me to book an appointment?"
-        
-        # Cost/price inquiry
-        elif any(word in msg_lower for word in ['cost', 'price', 'how much', 'charge', 'fee']):
-            return ("Service costs vary depending on the repair needed. Our technician will provide a detailed quote "
-                   "after inspection. The diagnostic check is complimentary. Would you like to proceed with booking?")
+        if intent == 'explain':
+            issues = diagnosis.get('issues', [])
+            if issues:
+                return fallback_reply('explain_issue', language, issue=issues[0])
+            return fallback_reply('explain_generic', language)
         
         # Urgency/time questions
-        elif any(word in msg_lower for word in ['urgent', 'now', 'immediately', 'wait', 'how long']):
-            if context and context.get('diagnosis_report', {}).get('status') == 'Critical':
-                return ("This is a critical safety issue. We strongly advise NOT driving the vehicle. "
-                       "I can arrange emergency roadside assistance or towing. Should I proceed?")
-            return "We have slots available as early as tomorrow morning. Would you like me to book the earliest available time?"
-        
-        # Thanks/acknowledgment
-        elif any(word in msg_lower for word in ['thank', 'thanks', 'ok', 'yes', 'sure', 'great']):
-            return "You're welcome! Your appointment is confirmed. We'll send you a reminder 24 hours before. Drive safely!"
+        elif intent == 'urgency':
+            return fallback_reply('urgency_critical' if diagnosis.get('status') == 'Critical' else 'urgency', language)
         
-        # Cancellation
-        elif any(word in msg_lower for word in ['cancel', 'no', 'later', 'not now']):
-            return "No problem. Feel free to reach out whenever you're ready. Stay safe!"
-        
-        # Default response
-        else:
-            return ("I'm here to help with your vehicle service needs. Would you like to:\n"
-                   "1. Schedule a service appointment\n"
-                   "2. Learn more about the detected issue\n"
-                   "3. Speak with a technician\n"
-                   "Please let me know how I can assist you.")
+        # Booking, cost, thanks and cancellation map straight to a reply; anything else gets the menu
+        return fallback_reply(intent if intent in ('booking', 'cost', 'thanks', 'decline') else 'menu', language)
     
-    def reset_conversation(self):
-        """Clear conversation history."""
-        self.conversation_history = []
+    def reset_conversation(self, session_id: str = DEFAULT_SESSION, vehicle_id: str = None):
+        """Clear conversation history for a session (one vehicle, or all of them)."""
+        self.conversations.reset(session_id, vehicle_id)
 
 
 # Singleton instance
@@ -193,3 +328,33 @@ def get_chatbot() -> CustomerServiceBot:
     if _bot_instance is None:
         _bot_instance = CustomerServiceBot()
     return _bot_instance
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    from src.response_cache import ResponseCache
+    
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    reply = ("Our diagnostics show your brake pads are close to the minimum safe thickness. "
+             "I recommend booking a service within the next few days. Would you like me to find a slot?")
+    client = StubChatClient(latency=0.25, token_latency=0.02, reply=reply)
+    bot = CustomerServiceBot(conversations=ConversationManager(persist=False), client=client,
+                             cache=ResponseCache(max_entries=0))
+    context = {'vehicle_id': 'V-005', 'diagnosis_report': {'status': 'Critical', 'issues': ['Brake pads worn']}}
+    print(f"=== CHAT STREAMING BENCHMARK: {n_messages} messages, stub LLM 250ms + 20ms/token ===")
+    
+    blocking, first_token, streamed = [], [], []
+    for i in range(n_messages):
+        start = time.perf_counter()
+        bot.chat(f"Question {i}", context, session_id="blocking")
+        blocking.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for j, _ in enumerate(bot.chat_stream(f"Question {i}", context, session_id="streaming")):
+            if j == 0:
+                first_token.append(time.perf_counter() - start)
+        streamed.append(time.perf_counter() - start)
+    
+    print(f"chat()        : first text after {sum(blocking) / n_messages * 1e3:7.1f}ms (whole reply)")
+    print(f"chat_stream() : first token after {sum(first_token) / n_messages * 1e3:7.1f}ms, "
+          f"complete after {sum(streamed) / n_messages * 1e3:7.1f}ms")
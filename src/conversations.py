@@ -0,0 +1,262 @@
+"""
+Conversation Manager
+Per-(session, vehicle) chat histories with bounded memory
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Dict, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.summarizer import get_summarizer
+
+
+class Conversation:
+    """
+    One customer conversation: a ring buffer of the most recent messages,
+    plus the facts folded out of older ones
+    """
+    
+    def __init__(self, session_id: str, vehicle_id: str, history_limit: int):
+        self.session_id = session_id
+        self.vehicle_id = vehicle_id
+        self.messages: deque = deque(maxlen=history_limit)
+        self.message_ids: deque = deque(maxlen=history_limit)  # Database ids, None when not persisted
+        self.facts: Dict = {}
+        self.summary: Optional[str] = None
+        self.through_message_id: Optional[int] = None
+        self.last_active = time.time()
+        self.rehydrated = False
+        self.lock = threading.Lock()
+    
+    def append(self, role: str, content: str, message_id: Optional[int] = None):
+        self.messages.append({"role": role, "content": content})
+        self.message_ids.append(message_id)
+        self.last_active = time.time()
+    
+    def pop_oldest(self, n: int) -> Tuple[List[Dict[str, str]], Optional[int]]:
+        """Remove the n oldest messages; returns them and the highest database id among them"""
+        folded = [self.messages.popleft() for _ in range(n)]
+        ids = [self.message_ids.popleft() for _ in range(n)]
+        return folded, max((i for i in ids if i is not None), default=None)
+    
+    def recent(self, n: Optional[int] = None) -> List[Dict[str, str]]:
+        """The last n messages (all when n is None), oldest first"""
+        messages = list(self.messages)
+        return messages if n is None else messages[-n:]
+    
+    def clear(self):
+        self.messages.clear()
+        self.message_ids.clear()
+        self.facts = {}
+        self.summary = None
+        self.through_message_id = None
+        self.last_active = time.time()
+
+
+class ConversationManager:
+    """
+    Conversations keyed by (session_id, vehicle_id).
+
+    Each history is a ring buffer of HISTORY_LIMIT messages, so a long chat
+    never grows past that bound. At most MAX_CONVERSATIONS stay in memory:
+    the least recently used is evicted when a new one is opened, and any
+    left untouched for IDLE_TIMEOUT seconds are dropped by evict_idle(),
+    which get() runs at most once every IDLE_SWEEP_INTERVAL seconds.
+
+    An evicted or never-seen conversation is rehydrated lazily from
+    Database.get_conversation_history() the first time it is touched again.
+    Messages are written through to the database as they are appended, so
+    nothing is lost when a conversation is dropped from memory.
+    
+    Once a conversation holds more than compact_at messages, all but the
+    last keep_recent are folded by the summarizer into a rolling summary
+    (see summarizer.FactSummarizer), which is saved to the database with the
+    id of the last folded message; rehydration restores the summary and only
+    the messages after it. The LLM therefore gets a bounded prompt that
+    still carries the booked slot, severity and issues from long ago.
+    Pass compact_at=None to keep plain ring-buffer behaviour.
+    """
+    
+    HISTORY_LIMIT = 20  # Messages kept per conversation (the LLM sees the last 10)
+    MAX_CONVERSATIONS = 500
+    IDLE_TIMEOUT = 30 * 60  # Seconds
+    IDLE_SWEEP_INTERVAL = 60  # Seconds
+    COMPACT_AT = 10  # Matches the LLM window, so no message drops out of the prompt unsummarized
+    KEEP_RECENT = 4
+    
+    def __init__(self, database=None, history_limit: int = HISTORY_LIMIT,
+                 max_conversations: int = MAX_CONVERSATIONS, persist: bool = True,
+                 summarizer=None, compact_at: Optional[int] = COMPACT_AT, keep_recent: int = KEEP_RECENT):
+        if compact_at is not None and not keep_recent < compact_at <= history_limit:
+            raise ValueError("Need keep_recent < compact_at <= history_limit")
+        self._database = database
+        self.history_limit = history_limit
+        self.max_conversations = max_conversations
+        self.persist = persist
+        self.summarizer = summarizer or get_summarizer()
+        self.compact_at = compact_at
+        self.keep_recent = keep_recent
+        self._conversations: "OrderedDict[Tuple[str, str], Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_idle_sweep = time.time()
+        self.evictions = 0
+        self.rehydrations = 0
+        self.compactions = 0
+        self.folded_messages = 0
+    
+    @property
+    def database(self):
+        if self._database is None:
+            from src.database import get_database
+            self._database = get_database()
+        return self._database
+    
+    def get(self, session_id: str, vehicle_id: str) -> Conversation:
+        """Fetch (or open) a conversation and mark it most recently used"""
+        if time.time() - self._last_idle_sweep > self.IDLE_SWEEP_INTERVAL:
+            self.evict_idle()
+        
+        key = (session_id, vehicle_id)
+        with self._lock:
+            conversation = self._conversations.get(key)
+            if conversation is not None:
+                self._conversations.move_to_end(key)
+            else:
+                conversation = self._conversations[key] = Conversation(session_id, vehicle_id, self.history_limit)
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+                    self.evictions += 1
+        
+        # Rehydrate outside the manager lock so one slow read doesn't block other sessions
+        if not conversation.rehydrated:
+            with conversation.lock:
+                if not conversation.rehydrated:
+                    self._rehydrate(conversation)
+        return conversation
+    
+    def _rehydrate(self, conversation: Conversation):
+        conversation.rehydrated = True
+        if not self.persist:
+            return
+        try:
+            summary = self.database.get_conversation_summary(conversation.session_id, conversation.vehicle_id)
+            folded_through = (summary or {}).get('through_message_id') or 0
+            # This session's messages plus untagged ones (e.g. alerts), after those already folded
+            stored = self.database.get_conversation_history(conversation.vehicle_id, limit=self.history_limit,
+                                                            session_id=conversation.session_id,
+                                                            after_id=folded_through)
+        except Exception as e:
+            print(f"[Conversations] Rehydration failed for {conversation.vehicle_id}: {e}")
+            return
+        
+        if summary:
+            conversation.facts = summary['facts']
+            conversation.summary = summary['summary']
+            conversation.through_message_id = summary['through_message_id']
+        for row in stored:
+            conversation.append(row['role'], row['message'], row['id'])
+        self.rehydrations += 1
+        self._compact(conversation)
+    
+    def _compact(self, conversation: Conversation):
+        """Fold all but the newest keep_recent messages into the summary (caller holds conversation.lock)"""
+        if self.compact_at is None or len(conversation.messages) <= self.compact_at:
+            return
+        folded, through_id = conversation.pop_oldest(len(conversation.messages) - self.keep_recent)
+        conversation.facts = self.summarizer.summarize(conversation.facts, folded)
+        conversation.summary = self.summarizer.render(conversation.facts)
+        if through_id is not None:
+            conversation.through_message_id = through_id
+        self.compactions += 1
+        self.folded_messages += len(folded)
+        
+        if self.persist:
+            try:
+                self.database.save_conversation_summary(conversation.session_id, conversation.vehicle_id,
+                                                        conversation.summary, conversation.facts,
+                                                        conversation.through_message_id)
+            except Exception as e:
+                print(f"[Conversations] Could not persist summary for {conversation.vehicle_id}: {e}")
+    
+    def append(self, session_id: str, vehicle_id: str, role: str, content: str,
+               metadata: Optional[Dict] = None) -> Conversation:
+        """Add a message to the conversation, write it through to the database and compact if due"""
+        conversation = self.get(session_id, vehicle_id)
+        
+        message_id = None
+        if self.persist:
+            try:
+                message_id = self.database.save_message(vehicle_id, role, content,
+                                                        dict(metadata or {}, session_id=session_id),
+                                                        session_id=session_id)
+            except Exception as e:
+                print(f"[Conversations] Could not persist message for {vehicle_id}: {e}")
+        
+        with conversation.lock:
+            conversation.append(role, content, message_id)
+            self._compact(conversation)
+        return conversation
+    
+    def history(self, session_id: str, vehicle_id: str, n: Optional[int] = None) -> List[Dict[str, str]]:
+        conversation = self.get(session_id, vehicle_id)
+        with conversation.lock:
+            return conversation.recent(n)
+    
+    def summary(self, session_id: str, vehicle_id: str) -> Optional[str]:
+        """Rolling summary of the messages folded out of history, or None"""
+        conversation = self.get(session_id, vehicle_id)
+        with conversation.lock:
+            return conversation.summary
+    
+    def reset(self, session_id: str, vehicle_id: Optional[str] = None):
+        """Forget a session's history (one vehicle, or all of them), in memory and in the database"""
+        with self._lock:
+            conversations = [c for key, c in self._conversations.items()
+                             if key[0] == session_id and (vehicle_id is None or key[1] == vehicle_id)]
+        for conversation in conversations:
+            with conversation.lock:
+                conversation.clear()
+        
+        if self.persist:
+            try:
+                self.database.delete_conversation(session_id, vehicle_id)
+            except Exception as e:
+                print(f"[Conversations] Could not delete stored history for session {session_id}: {e}")
+    
+    def evict_idle(self, max_idle: Optional[float] = None) -> int:
+        """Drop conversations idle for longer than max_idle seconds; returns how many"""
+        cutoff = time.time() - (self.IDLE_TIMEOUT if max_idle is None else max_idle)
+        with self._lock:
+            self._last_idle_sweep = time.time()
+            idle = [key for key, c in self._conversations.items() if c.last_active < cutoff]
+            for key in idle:
+                del self._conversations[key]
+            self.evictions += len(idle)
+        return len(idle)
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'active_conversations': len(self._conversations),
+                'buffered_messages': sum(len(c.messages) for c in self._conversations.values()),
+                'evictions': self.evictions,
+                'rehydrations': self.rehydrations,
+                'compactions': self.compactions,
+                'folded_messages': self.folded_messages
+            }
+
+
+# Singleton instance
+_manager_instance = None
+
+def get_conversation_manager() -> ConversationManager:
+    """Get or create the conversation manager instance"""
+    global _manager_instance
+    if _manager_instance is None:
+        _manager_instance = ConversationManager()
+    return _manager_instance
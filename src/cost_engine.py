@@ -0,0 +1,349 @@
+"""
+Maintenance Cost Engine
+Evaluates what-if maintenance policies (service now vs. defer N days) per vehicle
+"""
+
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+import threading
+import numpy as np
+
+@dataclass(frozen=True)
+class MaintenancePolicy:
+    """Service each vehicle after defer_days (None = run to failure)"""
+    name: str
+    defer_days: Optional[int]
+    
+    def to_dict(self):
+        return {'name': self.name, 'defer_days': self.defer_days}
+
+
+DEFAULT_POLICIES = [
+    MaintenancePolicy('Service now', 0),
+    MaintenancePolicy('Defer 3 days', 3),
+    MaintenancePolicy('Defer 7 days', 7),
+    MaintenancePolicy('Defer 14 days', 14),
+    MaintenancePolicy('Defer 21 days', 21),
+    MaintenancePolicy('Defer 30 days', 30),
+    MaintenancePolicy('Defer 45 days', 45),
+    MaintenancePolicy('Defer 60 days', 60),
+    MaintenancePolicy('Defer 90 days', 90),
+    MaintenancePolicy('Run to failure', None),
+]
+
+
+class ScenarioResult:
+    """
+    Expected cost of every vehicle under every policy
+    
+    Held per distinct vehicle state: vehicle i is in state states[i] and
+    weights counts the vehicles in each state, so fleet totals are a weighted
+    sum over states and per-vehicle matrices are only built if read.
+    """
+    
+    def __init__(self, vehicle_ids: List[str], policies: List[MaintenancePolicy],
+                 state_costs: np.ndarray, state_failure_probability: np.ndarray,
+                 states: np.ndarray, weights: np.ndarray):
+        self.vehicle_ids = vehicle_ids
+        self.policies = policies
+        self.state_costs = state_costs  # (states, policies)
+        self.state_failure_probability = state_failure_probability  # (states, policies)
+        self.states = states  # vehicle -> state row
+        self.weights = weights  # vehicles per state
+    
+    @property
+    def costs(self) -> np.ndarray:
+        """(vehicles, policies)"""
+        return self.state_costs[self.states]
+    
+    @property
+    def failure_probability(self) -> np.ndarray:
+        """(vehicles, policies)"""
+        return self.state_failure_probability[self.states]
+    
+    def totals(self) -> List[Dict]:
+        """Fleet totals per policy"""
+        totals = self.weights @ self.state_costs
+        failures = self.weights @ self.state_failure_probability
+        return [
+            {
+                'policy': policy.name,
+                'defer_days': policy.defer_days,
+                'total_cost': round(float(totals[j]), 2),
+                'expected_failures': round(float(failures[j]), 2)
+            }
+            for j, policy in enumerate(self.policies)
+        ]
+    
+    def best_policy_per_vehicle(self) -> Dict[str, str]:
+        best = self.state_costs.argmin(axis=1)[self.states] if len(self.vehicle_ids) else []
+        return {vehicle_id: self.policies[j].name for vehicle_id, j in zip(self.vehicle_ids, best)}
+    
+    def optimal_total(self) -> float:
+        """Fleet cost when each vehicle follows its own cheapest policy"""
+        return float(self.weights @ self.state_costs.min(axis=1)) if len(self.vehicle_ids) else 0.0
+
+
+class CostEngine:
+    """
+    Expected maintenance cost per vehicle under a deferral policy.
+
+    A vehicle's state is its status, the component expected to fail first,
+    the days until it crosses its threshold and how much that estimate is
+    trusted (the fit's R^2). Under "defer N days" the component either fails
+    before N days and incurs the breakdown cost, or it is serviced at day N
+    at the planned cost plus the value of the life still left in the
+    discarded part. Breakdown is assumed FAILURE_GRACE_DAYS after the threshold
+    crossing, and that time is treated as uncertain, with a spread
+    that widens as the fit gets worse. Only costs inside HORIZON_DAYS count.
+
+    States are quantized (half days, R^2 to 0.05) and packed into an integer
+    key. The key space is small (status x component x day step x R^2 step),
+    so expected costs are memoized in one dense table per policy, indexed
+    directly by key. A fleet is reduced to its distinct states with one
+    bincount over the key space, those states are looked up with a gather,
+    and only states never seen before are computed.
+    """
+    
+    HORIZON_DAYS = 90
+    DOWNTIME_COST_PER_HOUR = 40
+    PLANNED_DOWNTIME_HOURS = 4
+    FAILURE_DOWNTIME_HOURS = 48
+    FAILURE_GRACE_DAYS = 7  # Typical time from crossing a critical threshold to an actual breakdown
+    MAX_CACHED_POLICIES = 16  # Each policy's table covers the whole key space (~3MB)
+    
+    # Part + labour (USD), and expected service life of a replacement part
+    COMPONENT_COSTS = {
+        'Brake Pads': {'planned': 250, 'failure': 1800, 'life_days': 365},
+        'Battery': {'planned': 180, 'failure': 900, 'life_days': 1095},
+    }
+    
+    # Without telemetry history: assumed days to failure by status, and low trust in it
+    STATUS_DAYS_TO_FAILURE = {
+        'Critical': 0,
+        'High': 15,
+        'Medium': 45,
+        'Low': 120,
+        'Normal': 365
+    }
+    STATUS_R2 = 0.5
+    
+    DAY_STEP = 0.5
+    R2_STEP = 0.05
+    
+    def __init__(self, maintenance_costs: Dict[str, int]):
+        # Copied: memoized costs must not drift if the caller mutates its dict
+        self.maintenance_costs = dict(maintenance_costs)
+        self.statuses = list(self.STATUS_DAYS_TO_FAILURE)
+        # 'General' covers vehicles whose failing component is unknown
+        self.components = list(self.COMPONENT_COSTS) + ['General']
+        cap = int(2 * self.HORIZON_DAYS / self.DAY_STEP)
+        self._key_space = len(self.statuses) * len(self.components) * (cap + 1) * 32
+        
+        # defer_days -> (computed mask, expected costs, failure probabilities), indexed by state key
+        self._cache: Dict[Optional[int], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._entries = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    # --- Vehicle state ---
+    
+    def vehicle_states(self, vehicles: List[Dict], forecasts: Optional[Dict[str, List[Dict]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Columnar state arrays for a fleet listing
+
+        forecasts is DegradationModel.component_forecasts(); vehicles without
+        one fall back to STATUS_DAYS_TO_FAILURE for their status.
+        """
+        forecasts = forecasts or {}
+        n = len(vehicles)
+        status_codes = np.empty(n, dtype=np.int64)
+        component_codes = np.empty(n, dtype=np.int64)
+        days = np.empty(n)
+        r2 = np.empty(n)
+        status_index = {status: i for i, status in enumerate(self.statuses)}
+        component_index = {component: i for i, component in enumerate(self.components)}
+        
+        for i, vehicle in enumerate(vehicles):
+            status = vehicle.get('status', 'Normal')
+            status_codes[i] = status_index.get(status, status_index['Normal'])
+            components = forecasts.get(vehicle['vehicle_id'])
+            if components:
+                soonest = components[0]
+                component_codes[i] = component_index.get(soonest['component'], component_index['General'])
+                days[i] = soonest['days_to_threshold']
+                r2[i] = soonest['r2']
+            else:
+                component_codes[i] = component_index['General']
+                days[i] = self.STATUS_DAYS_TO_FAILURE.get(status, self.STATUS_DAYS_TO_FAILURE['Normal'])
+                r2[i] = self.STATUS_R2
+        
+        return {'status': status_codes, 'component': component_codes, 'days': days, 'r2': r2}
+    
+    def _state_keys(self, states: Dict[str, np.ndarray]) -> np.ndarray:
+        """Pack quantized states into one int64 key per vehicle"""
+        # Not degrading (inf) and anything past the horizon behave the same
+        cap = int(2 * self.HORIZON_DAYS / self.DAY_STEP)
+        days = np.nan_to_num(states['days'], nan=cap * self.DAY_STEP, posinf=cap * self.DAY_STEP)
+        day_q = np.clip(np.round(days / self.DAY_STEP), 0, cap).astype(np.int64)
+        r2_q = np.clip(np.round(states['r2'] / self.R2_STEP), 0, round(1 / self.R2_STEP)).astype(np.int64)
+        return ((states['status'] * len(self.components) + states['component']) * (cap + 1) + day_q) * 32 + r2_q
+    
+    def _unpack(self, keys: np.ndarray) -> Dict[str, np.ndarray]:
+        cap = int(2 * self.HORIZON_DAYS / self.DAY_STEP)
+        r2_q = keys % 32
+        rest = keys // 32
+        day_q = rest % (cap + 1)
+        rest //= cap + 1
+        return {
+            'status': rest // len(self.components),
+            'component': rest % len(self.components),
+            'days': day_q * self.DAY_STEP,
+            'r2': r2_q * self.R2_STEP
+        }
+    
+    # --- Cost model ---
+    
+    def _component_costs(self, status_codes: np.ndarray, component_codes: np.ndarray):
+        """Planned cost, failure cost and part life per state"""
+        general_planned = np.array([self.maintenance_costs.get(s, 0) for s in self.statuses], dtype=np.float64)
+        planned = np.array([self.COMPONENT_COSTS[c]['planned'] for c in self.components[:-1]] + [0.0])
+        failure = np.array([self.COMPONENT_COSTS[c]['failure'] for c in self.components[:-1]] + [0.0])
+        life = np.array([self.COMPONENT_COSTS[c]['life_days'] for c in self.components[:-1]] + [365.0])
+        
+        general = component_codes == len(self.components) - 1
+        planned_cost = np.where(general, general_planned[status_codes], planned[component_codes])
+        # Unplanned repairs of an unknown component: roughly 3x the scheduled price
+        failure_cost = np.where(general, 3 * general_planned[status_codes], failure[component_codes])
+        return planned_cost, failure_cost, life[component_codes]
+    
+    def _evaluate(self, keys: np.ndarray, policies: List[MaintenancePolicy]) -> Tuple[np.ndarray, np.ndarray]:
+        """Expected cost and failure probability, (states, policies), for unique state keys"""
+        states = self._unpack(keys)
+        planned, failure, life = self._component_costs(states['status'], states['component'])
+        planned = planned + self.PLANNED_DOWNTIME_HOURS * self.DOWNTIME_COST_PER_HOUR
+        failure = failure + self.FAILURE_DOWNTIME_HOURS * self.DOWNTIME_COST_PER_HOUR
+        days = states['days'][:, None]
+        
+        # Spread of the failure time: a few days at best, widening as trust in the fit drops
+        spread = 2.0 + days * (1.0 - states['r2'][:, None])
+        
+        defer = np.array([
+            self.HORIZON_DAYS if p.defer_days is None else min(p.defer_days, self.HORIZON_DAYS)
+            for p in policies
+        ], dtype=np.float64)[None, :]
+        run_to_failure = np.array([p.defer_days is None for p in policies])[None, :]
+        
+        p_fail = 1.0 / (1.0 + np.exp(-(defer - days - self.FAILURE_GRACE_DAYS) / spread))
+        early_service = planned[:, None] + planned[:, None] * np.clip(days - defer, 0, life[:, None]) / life[:, None]
+        # Run to failure never services inside the horizon
+        service = np.where(run_to_failure, 0.0, early_service)
+        costs = p_fail * failure[:, None] + (1.0 - p_fail) * service
+        return costs, p_fail
+    
+    def evaluate_states(self, states: Dict[str, np.ndarray], vehicle_ids: List[str],
+                        policies: Optional[List[MaintenancePolicy]] = None) -> ScenarioResult:
+        """Evaluate columnar states under each policy, computing only unseen (state, policy) pairs"""
+        policies = list(DEFAULT_POLICIES if policies is None else policies)
+        keys = self._state_keys(states)
+        counts = np.bincount(keys, minlength=self._key_space)
+        present = np.flatnonzero(counts)
+        row_of = np.zeros(self._key_space, dtype=np.int64)
+        row_of[present] = np.arange(len(present))
+        
+        costs = np.empty((len(present), len(policies)))
+        p_fail = np.empty((len(present), len(policies)))
+        with self._lock:
+            for j, policy in enumerate(policies):
+                table = self._cache.get(policy.defer_days)
+                if table is None:
+                    if len(self._cache) >= self.MAX_CACHED_POLICIES:
+                        self._cache.clear()
+                        self._entries = 0
+                    table = self._cache[policy.defer_days] = (
+                        np.zeros(self._key_space, dtype=bool), np.empty(self._key_space), np.empty(self._key_space)
+                    )
+                computed, cached_costs, cached_p = table
+                
+                missing = present[~computed[present]]
+                self.hits += len(present) - len(missing)
+                self.misses += len(missing)
+                if len(missing):
+                    fresh_costs, fresh_p = self._evaluate(missing, [policy])
+                    cached_costs[missing] = fresh_costs[:, 0]
+                    cached_p[missing] = fresh_p[:, 0]
+                    computed[missing] = True
+                    self._entries += len(missing)
+                
+                costs[:, j] = cached_costs[present]
+                p_fail[:, j] = cached_p[present]
+        
+        return ScenarioResult(vehicle_ids, policies, costs, p_fail, row_of[keys], counts[present].astype(np.float64))
+    
+    def evaluate(self, vehicles: List[Dict], policies: Optional[List[MaintenancePolicy]] = None,
+                 forecasts: Optional[Dict[str, List[Dict]]] = None) -> ScenarioResult:
+        """Evaluate a fleet listing under each policy"""
+        states = self.vehicle_states(vehicles, forecasts)
+        return self.evaluate_states(states, [v['vehicle_id'] for v in vehicles], policies)
+    
+    def cache_info(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': self._entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 1) if total else 0.0
+        }
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+            self._entries = 0
+            self.hits = self.misses = 0
+
+
+# Singleton instances, one per maintenance cost table (memoized costs depend on it)
+_engine_instances: Dict[Tuple[Tuple[str, int], ...], CostEngine] = {}
+
+def get_cost_engine(maintenance_costs: Dict[str, int]) -> CostEngine:
+    """Get or create the cost engine instance for a maintenance cost table"""
+    key = tuple(sorted(maintenance_costs.items()))
+    engine = _engine_instances.get(key)
+    if engine is None:
+        engine = _engine_instances[key] = CostEngine(maintenance_costs)
+    return engine
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import sys
+    import time
+    
+    n_vehicles = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"=== COST ENGINE BENCHMARK: {n_vehicles:,} vehicles x {len(DEFAULT_POLICIES)} policies ===")
+    
+    rng = np.random.default_rng(5)
+    engine = CostEngine({'Critical': 5000, 'High': 3000, 'Medium': 1500, 'Low': 500, 'Normal': 200})
+    states = {
+        'status': rng.integers(0, len(engine.statuses), n_vehicles),
+        'component': rng.integers(0, len(engine.components), n_vehicles),
+        'days': rng.exponential(40, n_vehicles),
+        'r2': rng.uniform(0.3, 1.0, n_vehicles)
+    }
+    ids = [f"V-{i:07d}" for i in range(n_vehicles)]
+    
+    start = time.perf_counter()
+    cold = engine.evaluate_states(states, ids)
+    cold_secs = time.perf_counter() - start
+    print(f"Cold          : {cold_secs * 1e3:8.1f}ms  {engine.cache_info()}")
+    
+    start = time.perf_counter()
+    warm = engine.evaluate_states(states, ids)
+    warm_secs = time.perf_counter() - start
+    print(f"Warm          : {warm_secs * 1e3:8.1f}ms  {engine.cache_info()}")
+    print("Identical     :", "YES" if np.array_equal(cold.costs, warm.costs) else "NO")
+    
+    for row in cold.totals():
+        print(f"  {row['policy']:<16} ${row['total_cost']:>16,.0f}   expected failures {row['expected_failures']:>12,.1f}")
+    print(f"  {'Per-vehicle best':<16} ${cold.optimal_total():>16,.0f}")
@@ -7,7 +7,8 @@ import sqlite3
 import json
 import os
 from datetime import datetime
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import List, Dict, Optional, Iterable, Tuple, Union
 
 class Database:
     def __init__(self, db_path: str = None):
@@ -34,10 +35,27 @@ class Database:
             role TEXT,
             message TEXT,
             metadata TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            session_id TEXT
         )
         ''')
         
+        # Databases created before session_id was a column kept it in metadata only
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(conversations)')]
+        if 'session_id' not in columns:
+            cursor.execute('ALTER TABLE conversations ADD COLUMN session_id TEXT')
+            try:
+                cursor.execute('''
+                UPDATE conversations SET session_id = json_extract(metadata, '$.session_id')
+                WHERE metadata LIKE '%"session_id"%'
+                ''')
+            except sqlite3.OperationalError:
+                pass  # SQLite built without JSON support; old rows stay untagged
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_vehicle_session
+        ON conversations (vehicle_id, session_id, id)
+        ''')
+        
         # Diagnostic history table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS diagnostics (
@@ -51,6 +69,19 @@ class Database:
         )
         ''')
         
+        # Rolling summaries of older conversation turns, one per (session, vehicle)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            session_id TEXT,
+            vehicle_id TEXT,
+            summary TEXT,
+            facts TEXT,
+            through_message_id INTEGER,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, vehicle_id)
+        )
+        ''')
+        
         # Appointments table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS appointments (
@@ -67,33 +98,92 @@ class Database:
         conn.commit()
         conn.close()
     
-    def save_message(self, vehicle_id: str, role: str, message: str, metadata: Dict = None):
-        """Save a chat message"""
+    def save_message(self, vehicle_id: str, role: str, message: str, metadata: Dict = None,
+                     session_id: Optional[str] = None) -> int:
+        """Save a chat message and return its id (session_id defaults to metadata['session_id'])"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         metadata_json = json.dumps(metadata) if metadata else None
+        if session_id is None and metadata:
+            session_id = metadata.get('session_id')
         
         cursor.execute('''
-        INSERT INTO conversations (vehicle_id, role, message, metadata)
-        VALUES (?, ?, ?, ?)
-        ''', (vehicle_id, role, message, metadata_json))
+        INSERT INTO conversations (vehicle_id, role, message, metadata, session_id)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (vehicle_id, role, message, metadata_json, session_id))
         
+        message_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        
+        return message_id
+    
+    def save_messages(self, rows: Iterable[Tuple[str, str, str, Union[Dict, str, None]]],
+                      batch_size: int = 5000) -> int:
+        """
+        Bulk-save chat messages from (vehicle_id, role, message, metadata) rows
+        
+        Rows are consumed lazily in batches of batch_size and written with
+        executemany inside a single transaction, so a generator of tens of
+        thousands of alerts streams straight in without being materialized.
+        Metadata may be a dict or an already-serialized JSON string.
+        Returns the number of rows written.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        rows = iter(rows)
+        written = 0
+        
+        try:
+            while True:
+                batch = [
+                    (vehicle_id, role, message,
+                     metadata if metadata is None or isinstance(metadata, str) else json.dumps(metadata))
+                    for vehicle_id, role, message, metadata in islice(rows, batch_size)
+                ]
+                if not batch:
+                    break
+                cursor.executemany('''
+                INSERT INTO conversations (vehicle_id, role, message, metadata)
+                VALUES (?, ?, ?, ?)
+                ''', batch)
+                written += len(batch)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        return written
     
-    def get_conversation_history(self, vehicle_id: str, limit: int = 50) -> List[Dict]:
-        """Get conversation history for a vehicle"""
+    def get_conversation_history(self, vehicle_id: str, limit: int = 50, session_id: Optional[str] = None,
+                                 after_id: int = 0) -> List[Dict]:
+        """
+        Get conversation history for a vehicle
+        
+        With session_id, only that session's messages plus untagged ones
+        (alerts sent to the vehicle) are returned, so other sessions on the
+        same vehicle can't push them out of the limit. after_id skips
+        messages up to and including that id.
+        """
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute('''
-        SELECT role, message, metadata, timestamp
-        FROM conversations
-        WHERE vehicle_id = ?
-        ORDER BY timestamp DESC
-        LIMIT ?
-        ''', (vehicle_id, limit))
+        if session_id is None:
+            cursor.execute('''
+            SELECT role, message, metadata, timestamp, id
+            FROM conversations
+            WHERE vehicle_id = ? AND id > ?
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+            ''', (vehicle_id, after_id, limit))
+        else:
+            cursor.execute('''
+            SELECT role, message, metadata, timestamp, id
+            FROM conversations
+            WHERE vehicle_id = ? AND (session_id = ? OR session_id IS NULL) AND id > ?
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+            ''', (vehicle_id, session_id, after_id, limit))
         
         rows = cursor.fetchall()
         conn.close()
@@ -104,11 +194,71 @@ class Database:
                 'role': row[0],
                 'message': row[1],
                 'metadata': json.loads(row[2]) if row[2] else {},
-                'timestamp': row[3]
+                'timestamp': row[3],
+                'id': row[4]
             })
         
         return list(reversed(history))  # Return in chronological order
     
+    def save_conversation_summary(self, session_id: str, vehicle_id: str, summary: str,
+                                  facts: Dict, through_message_id: Optional[int] = None):
+        """Store (or replace) the rolling summary of a conversation's older turns"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT OR REPLACE INTO conversation_summaries
+            (session_id, vehicle_id, summary, facts, through_message_id, updated_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (session_id, vehicle_id, summary, json.dumps(facts), through_message_id))
+        
+        conn.commit()
+        conn.close()
+    
+    def delete_conversation(self, session_id: str, vehicle_id: Optional[str] = None) -> int:
+        """Delete a session's messages and summary (one vehicle, or all of them); returns messages deleted"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        if vehicle_id is None:
+            cursor.execute('DELETE FROM conversations WHERE session_id = ?', (session_id,))
+            deleted = cursor.rowcount
+            cursor.execute('DELETE FROM conversation_summaries WHERE session_id = ?', (session_id,))
+        else:
+            cursor.execute('DELETE FROM conversations WHERE session_id = ? AND vehicle_id = ?',
+                           (session_id, vehicle_id))
+            deleted = cursor.rowcount
+            cursor.execute('DELETE FROM conversation_summaries WHERE session_id = ? AND vehicle_id = ?',
+                           (session_id, vehicle_id))
+        
+        conn.commit()
+        conn.close()
+        
+        return deleted
+    
+    def get_conversation_summary(self, session_id: str, vehicle_id: str) -> Optional[Dict]:
+        """Get the rolling summary of a conversation, if one has been stored"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT summary, facts, through_message_id, updated_at
+        FROM conversation_summaries
+        WHERE session_id = ? AND vehicle_id = ?
+        ''', (session_id, vehicle_id))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row is None:
+            return None
+        return {
+            'summary': row[0],
+            'facts': json.loads(row[1]) if row[1] else {},
+            'through_message_id': row[2],
+            'updated_at': row[3]
+        }
+    
     def save_diagnostic(self, vehicle_id: str, severity: str, issues: List[str], 
                        diagnosis_report: Dict, user_id: str = None):
         """Save a diagnostic report"""
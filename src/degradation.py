@@ -0,0 +1,287 @@
+"""
+Component Degradation Model
+Fits per-vehicle wear rates from telemetry history and predicts days until
+each component crosses its failure threshold
+"""
+
+from typing import List, Dict, Optional, Sequence
+from datetime import datetime
+import numpy as np
+
+SECONDS_PER_DAY = 86400.0
+
+# Failure thresholds mirror the diagnosis rules in diagnosis.py
+COMPONENT_THRESHOLDS = {
+    'brake_pad_thickness_mm': {
+        'component': 'Brake Pads',
+        'threshold': 3.0,
+        'failure_status': 'Critical',
+        'recommendation': 'Schedule brake pad replacement before the critical threshold'
+    },
+    'battery_voltage_v': {
+        'component': 'Battery',
+        'threshold': 12.0,
+        'failure_status': 'High',
+        'recommendation': 'Schedule battery inspection and replacement'
+    }
+}
+
+
+def _to_epoch_seconds(timestamps) -> np.ndarray:
+    """Accept datetimes, ISO strings, datetime64 or epoch seconds"""
+    values = np.asarray(timestamps)
+    if values.dtype.kind in 'fiu':
+        return values.astype(np.float64)
+    if values.dtype.kind != 'M':
+        values = np.array([
+            np.datetime64(t.isoformat() if isinstance(t, datetime) else t, 'us') for t in values.ravel()
+        ])
+    return values.astype('datetime64[us]').astype(np.int64) / 1e6
+
+
+class DegradationModel:
+    """
+    Linear wear model per (vehicle, signal), refit incrementally.
+
+    For each vehicle and signal only the least-squares sufficient statistics
+    are kept (n, sum t, sum y, sum t^2, sum t*y, sum y^2) plus the latest sample.
+    New snapshots are folded in with np.add.at, so refitting after an ingest
+    is closed-form arithmetic over those arrays for the whole fleet at once,
+    with no need to revisit older telemetry.
+
+    Time is measured in days from a fixed origin to keep the sums well conditioned.
+    `version` increases whenever an ingest folds in new samples, so callers can
+    key their own caches on it; the fit and forecasts are memoized until then.
+    """
+    
+    MIN_SAMPLES = 3  # Samples required before a wear rate is trusted
+    MIN_WEAR_RATE = 1e-6  # Per day; flatter trends count as not degrading
+    
+    def __init__(self, signals: Sequence[str] = tuple(COMPONENT_THRESHOLDS),
+                 origin: Optional[datetime] = None):
+        self.signals = list(signals)
+        self.origin = _to_epoch_seconds([origin])[0] if origin else None
+        self.vehicle_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        
+        self._stats = {signal: np.zeros((0, 6)) for signal in self.signals}
+        self._last_t = {signal: np.zeros(0) for signal in self.signals}
+        self._last_y = {signal: np.zeros(0) for signal in self.signals}
+        self._fit: Optional[Dict[str, Dict[str, np.ndarray]]] = None
+        self._forecasts: Optional[Dict[str, List[Dict]]] = None
+        self.version = 0
+    
+    def __len__(self):
+        return len(self.vehicle_ids)
+    
+    def _rows_for(self, vehicle_ids: Sequence[str]) -> np.ndarray:
+        """Map vehicle IDs to rows, growing the arrays for unseen vehicles"""
+        rows = np.empty(len(vehicle_ids), dtype=np.int64)
+        for i, vehicle_id in enumerate(vehicle_ids):
+            row = self.rows.get(vehicle_id)
+            if row is None:
+                row = self.rows[vehicle_id] = len(self.vehicle_ids)
+                self.vehicle_ids.append(vehicle_id)
+            rows[i] = row
+        
+        grow = len(self.vehicle_ids) - len(self._last_t[self.signals[0]]) if self.signals else 0
+        if grow > 0:
+            for signal in self.signals:
+                self._stats[signal] = np.vstack([self._stats[signal], np.zeros((grow, 6))])
+                self._last_t[signal] = np.concatenate([self._last_t[signal], np.full(grow, -np.inf)])
+                self._last_y[signal] = np.concatenate([self._last_y[signal], np.full(grow, np.nan)])
+        return rows
+    
+    def ingest(self, vehicle_ids: Sequence[str], timestamps, values: Dict[str, Sequence[float]]):
+        """
+        Fold a batch of telemetry snapshots into the model
+
+        values maps signal name -> one reading per snapshot (NaN for missing).
+        Samples not newer than what the model already holds for that vehicle
+        are ignored, so re-ingesting the same snapshot is harmless.
+        """
+        if len(vehicle_ids) == 0:
+            return
+        
+        seconds = _to_epoch_seconds(timestamps)
+        if self.origin is None:
+            self.origin = float(seconds.min())
+        t = (seconds - self.origin) / SECONDS_PER_DAY
+        rows = self._rows_for(vehicle_ids)
+        
+        # Process in time order so the "latest sample" assignment keeps the newest
+        order = np.argsort(t, kind='stable')
+        rows, t = rows[order], t[order]
+        changed = False
+        
+        for signal in self.signals:
+            if signal not in values:
+                continue
+            y = np.asarray(values[signal], dtype=np.float64)[order]
+            
+            fresh = ~np.isnan(y) & (t > self._last_t[signal][rows])
+            # Drop duplicate (vehicle, time) pairs inside the batch
+            if fresh.any():
+                pairs = np.stack([rows[fresh], t[fresh]])
+                _, first = np.unique(pairs, axis=1, return_index=True)
+                keep = np.zeros(fresh.sum(), dtype=bool)
+                keep[first] = True
+                fresh[np.flatnonzero(fresh)[~keep]] = False
+            if not fresh.any():
+                continue
+            
+            r, tt, yy = rows[fresh], t[fresh], y[fresh]
+            np.add.at(self._stats[signal], r, np.column_stack([
+                np.ones_like(tt), tt, yy, tt * tt, tt * yy, yy * yy
+            ]))
+            self._last_t[signal][r] = tt
+            self._last_y[signal][r] = yy
+            changed = True
+        
+        # Re-ingesting snapshots already folded in keeps the memoized fit and forecasts
+        if changed:
+            self._fit = None
+            self._forecasts = None
+            self.version += 1
+    
+    def observe(self, vehicle_id: str, timestamp, telematics: Dict):
+        """Fold a single telemetry snapshot into the model"""
+        self.ingest(
+            [vehicle_id], [timestamp],
+            {signal: [telematics.get(signal, np.nan)] for signal in self.signals}
+        )
+    
+    def ingest_vehicles(self, vehicles: List[Dict]):
+        """
+        Fold the current telemetry of a fleet listing into the model
+        
+        Accepts raw vehicles.json records (timestamp under metadata) or the
+        dashboard's flattened records (timestamp under 'telemetry_timestamp').
+        """
+        ids, timestamps = [], []
+        values = {signal: [] for signal in self.signals}
+        
+        for vehicle in vehicles:
+            timestamp = vehicle.get('telemetry_timestamp') or vehicle.get('metadata', {}).get('timestamp')
+            telematics = vehicle.get('telematics')
+            if not timestamp or not telematics:
+                continue
+            ids.append(vehicle['vehicle_id'])
+            timestamps.append(timestamp)
+            for signal in self.signals:
+                values[signal].append(telematics.get(signal, np.nan))
+        
+        self.ingest(ids, timestamps, values)
+    
+    def fit(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Closed-form least squares for every vehicle and signal in one vectorized pass"""
+        if self._fit is not None:
+            return self._fit
+        
+        fits = {}
+        for signal in self.signals:
+            n, st, sy, stt, sty, syy = self._stats[signal].T
+            with np.errstate(divide='ignore', invalid='ignore'):
+                denom = n * stt - st * st
+                slope = np.where(denom > 0, (n * sty - st * sy) / denom, np.nan)
+                intercept = (sy - slope * st) / n
+                
+                # Coefficient of determination from the same sums
+                ss_tot = syy - sy * sy / n
+                ss_res = syy - intercept * sy - slope * sty
+                r2 = np.where(ss_tot > 1e-12, 1 - ss_res / ss_tot, 1.0)
+            
+            valid = (n >= self.MIN_SAMPLES) & ~np.isnan(slope)
+            fits[signal] = {
+                'slope_per_day': np.where(valid, slope, np.nan),
+                'intercept': np.where(valid, intercept, np.nan),
+                'r2': np.clip(np.where(valid, r2, np.nan), 0, 1),
+                'samples': n.astype(np.int64)
+            }
+        
+        self._fit = fits
+        return fits
+    
+    def predict_days_to_threshold(self, now=None) -> Dict[str, np.ndarray]:
+        """
+        Days from `now` (default: each vehicle's latest sample) until each
+        signal's fitted trend crosses its failure threshold
+
+        0 means already past the threshold; inf means not degrading towards it;
+        NaN means not enough history.
+        """
+        fits = self.fit()
+        t_now = None
+        if now is not None:
+            t_now = (_to_epoch_seconds([now])[0] - self.origin) / SECONDS_PER_DAY
+        
+        days = {}
+        for signal in self.signals:
+            threshold = COMPONENT_THRESHOLDS[signal]['threshold']
+            slope = fits[signal]['slope_per_day']
+            t_ref = self._last_t[signal] if t_now is None else np.full(len(self), t_now)
+            level = fits[signal]['intercept'] + slope * t_ref
+            
+            with np.errstate(divide='ignore', invalid='ignore'):
+                remaining = np.where(slope < -self.MIN_WEAR_RATE, (threshold - level) / slope, np.inf)
+            remaining = np.where(level <= threshold, 0.0, remaining)
+            days[signal] = np.where(np.isnan(slope), np.nan, np.maximum(remaining, 0.0))
+        
+        return days
+    
+    def component_forecasts(self, now=None) -> Dict[str, List[Dict]]:
+        """
+        Per-vehicle list of component forecasts, soonest failure first
+        
+        The default (now=None) result is memoized until the next ingest that
+        changes the model and is shared between callers, so treat it as read-only.
+        """
+        if now is None and self._forecasts is not None:
+            return self._forecasts
+        fits = self.fit()
+        days = self.predict_days_to_threshold(now)
+        forecasts: Dict[str, List[Dict]] = {}
+        
+        for signal in self.signals:
+            info = COMPONENT_THRESHOLDS[signal]
+            for row in np.flatnonzero(~np.isnan(days[signal])):
+                forecasts.setdefault(self.vehicle_ids[row], []).append({
+                    'component': info['component'],
+                    'signal': signal,
+                    'wear_rate_per_day': float(fits[signal]['slope_per_day'][row]),
+                    'days_to_threshold': float(days[signal][row]),
+                    'r2': float(fits[signal]['r2'][row]),
+                    'failure_status': info['failure_status'],
+                    'recommendation': info['recommendation']
+                })
+        
+        for items in forecasts.values():
+            items.sort(key=lambda f: f['days_to_threshold'])
+        if now is None:
+            self._forecasts = forecasts
+        return forecasts
+    
+    def fleet_trend(self, signal: str, days: int = 30) -> Optional[List[float]]:
+        """Fleet-average fitted level over the last `days` days (oldest first)"""
+        fits = self.fit().get(signal)
+        if fits is None:
+            return None
+        valid = ~np.isnan(fits['slope_per_day'])
+        if not valid.any():
+            return None
+        
+        t_end = self._last_t[signal][valid].max()
+        t = t_end - np.arange(days - 1, -1, -1)
+        levels = fits['intercept'][valid][:, None] + fits['slope_per_day'][valid][:, None] * t[None, :]
+        return levels.mean(axis=0).round(3).tolist()
+
+
+# Singleton instance
+_model_instance = None
+
+def get_degradation_model() -> DegradationModel:
+    """Get or create the degradation model instance"""
+    global _model_instance
+    if _model_instance is None:
+        _model_instance = DegradationModel()
+    return _model_instance
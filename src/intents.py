@@ -0,0 +1,175 @@
+"""
+Intent Classifier
+Keyword intent matching for the chatbot's rule-based (no-LLM) responder
+"""
+
+import os
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.localization import DEFAULT_LANGUAGE, INTENT_KEYWORDS as CATALOG_INTENT_KEYWORDS, resolve_language
+
+# English table (the per-language tables live in the localization catalog)
+INTENT_KEYWORDS: List[Tuple[str, List[str]]] = CATALOG_INTENT_KEYWORDS[DEFAULT_LANGUAGE]
+
+# Characters that continue a word: letters, digits, apostrophes, combining marks
+# (Indic vowel signs aren't \w) and zero-width joiners; the danda (U+0964/5) ends one
+_WORD_CHARS = r"\w'\u0300-\u036f\u0900-\u0963\u0966-\u0dff\u200c\u200d"
+
+
+def keywords_for_language(language: str) -> List[Tuple[str, List[str]]]:
+    """The language's keyword table with the English keywords added to each intent"""
+    language = resolve_language(language)
+    if language == DEFAULT_LANGUAGE:
+        return INTENT_KEYWORDS
+    english = dict(INTENT_KEYWORDS)
+    return [(intent, keywords + english.get(intent, [])) for intent, keywords in CATALOG_INTENT_KEYWORDS[language]]
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex alternation matching exactly the given words, factored by shared
+    prefix ("book|booked|booking" -> "book(?:ed|ing)?"); spaces match any whitespace
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node: Dict) -> str:
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if '' in node else body
+    
+    return build(trie)
+
+
+class _PriorityTable(dict):
+    """Keyword -> priority; a phrase matched across extra whitespace is looked up normalized"""
+    
+    def __missing__(self, phrase: str) -> int:
+        return self[" ".join(phrase.split())]
+
+
+class IntentClassifier:
+    """
+    Single-regex keyword intent matcher.
+    
+    Every keyword of every intent is compiled into one alternation, factored
+    into a prefix trie so the regex engine follows shared prefixes once
+    instead of retrying each keyword at every position. Matches must stand
+    on word boundaries, so "know" doesn't count as "no" and "book" doesn't
+    count as "ok". One findall over the lowercased message returns every
+    keyword present (in C), and the intent is the highest-priority one among
+    them. Matching is longest-first, so a two-word phrase takes its words
+    with it: "how long" is urgency, not "how", and "not now" is decline.
+    
+    Chat traffic repeats itself ("yes", "ok thanks", "book it"), so results
+    are memoized per exact message in an LRU of MEMO_SIZE entries.
+    """
+    
+    MEMO_SIZE = 4096
+    
+    def __init__(self, intent_keywords: List[Tuple[str, List[str]]] = INTENT_KEYWORDS,
+                 memo_size: int = MEMO_SIZE):
+        self.intents = [intent for intent, _ in intent_keywords]
+        self._priority = _PriorityTable()
+        for priority, (_, keywords) in enumerate(intent_keywords):
+            for keyword in keywords:
+                self._priority.setdefault(" ".join(keyword.lower().split()), priority)
+        
+        self._pattern = re.compile(f"(?<![{_WORD_CHARS}])(?:{trie_pattern(self._priority)})(?![{_WORD_CHARS}])")
+        self.classify = lru_cache(maxsize=memo_size)(self._classify) if memo_size else self._classify
+    
+    def _classify(self, message: str) -> Optional[str]:
+        """Highest-priority intent in the message, or None"""
+        found = self._pattern.findall(message.lower())
+        return self.intents[min(map(self._priority.__getitem__, found))] if found else None
+
+
+# Classifier instances, one per language
+_classifier_instances: Dict[str, IntentClassifier] = {}
+
+def get_intent_classifier(language: str = DEFAULT_LANGUAGE) -> IntentClassifier:
+    """Get or create the intent classifier for a language (unsupported languages get English)"""
+    language = resolve_language(language)
+    classifier = _classifier_instances.get(language)
+    if classifier is None:
+        classifier = _classifier_instances[language] = IntentClassifier(keywords_for_language(language))
+    return classifier
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import random
+    import time
+    
+    def substring_classify(message: str) -> Optional[str]:
+        """The previous responder's sequential substring scans, for comparison"""
+        msg_lower = message.lower()
+        if any(word in msg_lower for word in ['book', 'schedule', 'appointment', 'service', 'fix']):
+            return 'booking'
+        elif any(word in msg_lower for word in ['what', 'why', 'how', 'explain', 'issue', 'problem']):
+            return 'explain'
+        elif any(word in msg_lower for word in ['cost', 'price', 'how much', 'charge', 'fee']):
+            return 'cost'
+        elif any(word in msg_lower for word in ['urgent', 'now', 'immediately', 'wait', 'how long']):
+            return 'urgency'
+        elif any(word in msg_lower for word in ['thank', 'thanks', 'ok', 'yes', 'sure', 'great']):
+            return 'thanks'
+        elif any(word in msg_lower for word in ['cancel', 'no', 'later', 'not now']):
+            return 'decline'
+        return None
+    
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    rng = random.Random(11)
+    fillers = ["my", "car", "the", "brakes", "are", "making", "a", "noise", "today", "please", "I", "don't",
+               "know", "if", "it", "is", "safe", "to", "drive", "tomorrow", "morning", "dashboard", "light",
+               "came", "on", "again", "can", "you", "help", "me", "with", "this", "hello", "there"]
+    keywords = [k for _, words in INTENT_KEYWORDS for k in words]
+    corpus = []
+    for _ in range(n_messages):
+        words = rng.choices(fillers, k=rng.randint(4, 14))
+        if rng.random() < 0.7:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        corpus.append(" ".join(words).capitalize() + rng.choice(["?", ".", "!", ""]))
+    
+    print(f"=== INTENT CLASSIFIER BENCHMARK: {n_messages:,} messages ===")
+    
+    def timed(classify, messages):
+        """Best of three passes over the messages"""
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            labels = [classify(m) for m in messages]
+            best = min(best, time.perf_counter() - start)
+        return labels, best
+    
+    # Unique messages: raw per-message cost, memo disabled
+    legacy, legacy_secs = timed(substring_classify, corpus)
+    compiled, compiled_secs = timed(IntentClassifier(memo_size=0).classify, corpus)
+    print(f"Unique messages   substring {n_messages / legacy_secs:>10,.0f} msg/s   "
+          f"compiled {n_messages / compiled_secs:>10,.0f} msg/s   ({legacy_secs / compiled_secs:.1f}x)")
+    
+    # Live traffic: Zipf-distributed repeats of 2,000 distinct messages, memo enabled
+    distinct = corpus[:2000]
+    traffic = rng.choices(distinct, weights=[1 / (rank + 1) for rank in range(len(distinct))], k=n_messages)
+    _, traffic_legacy_secs = timed(substring_classify, traffic)
+    _, traffic_secs = timed(IntentClassifier().classify, traffic)
+    print(f"Repeated traffic  substring {n_messages / traffic_legacy_secs:>10,.0f} msg/s   "
+          f"compiled {n_messages / traffic_secs:>10,.0f} msg/s   ({traffic_legacy_secs / traffic_secs:.1f}x)")
+    
+    classifier = IntentClassifier()
+    changed = sum(a != b for a, b in zip(legacy, compiled))
+    print(f"Reclassified      {changed:,} messages ({changed / n_messages:.1%}): substring false hits and newly listed inflections")
+    for message in ["I know the light is on", "There is a strange noise", "It shows a warning", "How much?", "Okay, book it"]:
+        print(f"  {message!r:28} substring={substring_classify(message)!s:8} compiled={classifier.classify(message)}")
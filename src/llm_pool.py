@@ -0,0 +1,240 @@
+"""
+Async LLM Pool
+Concurrent chat completions over one shared client, with per-call deadlines
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Check if the async OpenAI client is available, otherwise every call falls back
+try:
+    import httpx
+    from openai import AsyncOpenAI
+    ASYNC_OPENAI_AVAILABLE = True
+except ImportError:
+    ASYNC_OPENAI_AVAILABLE = False
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# One job: the chat messages to send and the reply to use if the call times out or fails
+CompletionJob = Tuple[List[Dict[str, str]], Callable[[], str]]
+
+
+class AsyncStubChatClient:
+    """
+    Offline mock of AsyncOpenAI (await client.chat.completions.create)
+
+    Injects `latency` seconds per call (plus up to `jitter`); every
+    `slow_every`-th call takes `slow_latency` instead, to exercise deadlines.
+    Tracks call count and peak concurrency.
+    """
+    
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, slow_every: int = 0,
+                 slow_latency: float = 30.0, reply: str = "Stub reply to: {message}"):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.reply = reply
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    async def _create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        # Runs on a single event loop, so plain counters are safe
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            delay = self.latency + self.jitter * ((call * 7919) % 100) / 100
+            if self.slow_every and call % self.slow_every == 0:
+                delay = self.slow_latency
+            await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+        last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        message = SimpleNamespace(content=self.reply.format(message=last_user))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class LLMPool:
+    """
+    Runs chat completions concurrently on one long-lived async client.
+
+    The pool owns a background event loop thread, so the client and its
+    HTTP connection pool are created once and reused by every batch, and
+    synchronous callers (graph nodes, Streamlit) can submit work without
+    running a loop of their own. A semaphore caps in-flight requests at
+    max_concurrency; each request gets its own deadline, and a request that
+    times out or errors resolves to its fallback instead of failing the batch.
+    """
+    
+    DEFAULT_CONCURRENCY = 16
+    DEFAULT_TIMEOUT = 8.0  # Seconds per completion, measured once a slot is acquired
+    
+    def __init__(self, client=None, max_concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT, model: str = DEFAULT_MODEL):
+        if client is None and ASYNC_OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
+            limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+            client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0,  # The deadline and fallback replace retries
+                http_client=httpx.AsyncClient(limits=limits)
+            )
+        self.client = client
+        self.available = client is not None
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.model = model
+        
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+        
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.fallbacks = 0
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="llm-pool", daemon=True)
+                self._thread.start()
+        return self._loop
+    
+    async def _complete(self, messages: List[Dict[str, str]], fallback: Callable[[], str],
+                        timeout: float) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async with self._semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.7,
+                        max_tokens=200
+                    ),
+                    timeout
+                )
+                self.completed += 1
+                return response.choices[0].message.content.strip()
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[LLMPool] Completion failed: {e}")
+        
+        self.fallbacks += 1
+        return fallback()
+    
+    async def _complete_many(self, jobs: Sequence[CompletionJob], timeout: float) -> List[str]:
+        return await asyncio.gather(*(self._complete(messages, fallback, timeout) for messages, fallback in jobs))
+    
+    def _submit(self, jobs: Sequence[CompletionJob], timeout: Optional[float]):
+        timeout = self.timeout if timeout is None else timeout
+        return asyncio.run_coroutine_threadsafe(self._complete_many(list(jobs), timeout), self._ensure_loop())
+    
+    def complete_many(self, jobs: Sequence[CompletionJob], timeout: Optional[float] = None) -> List[str]:
+        """Run every job concurrently and return replies in job order (blocking)"""
+        if not jobs:
+            return []
+        if not self.available:
+            self.fallbacks += len(jobs)
+            return [fallback() for _, fallback in jobs]
+        return self._submit(jobs, timeout).result()
+    
+    async def acomplete_many(self, jobs: Sequence[CompletionJob], timeout: Optional[float] = None) -> List[str]:
+        """Awaitable complete_many, usable from any event loop"""
+        if not jobs:
+            return []
+        if not self.available:
+            self.fallbacks += len(jobs)
+            return [fallback() for _, fallback in jobs]
+        return await asyncio.wrap_future(self._submit(jobs, timeout))
+    
+    def complete(self, messages: List[Dict[str, str]], fallback: Callable[[], str],
+                 timeout: Optional[float] = None) -> str:
+        return self.complete_many([(messages, fallback)], timeout)[0]
+    
+    def get_stats(self) -> Dict:
+        return {
+            'available': self.available,
+            'max_concurrency': self.max_concurrency,
+            'completed': self.completed,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'fallbacks': self.fallbacks
+        }
+    
+    def close(self):
+        """Stop the background loop (the pool restarts it on next use)"""
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = self._thread = self._semaphore = None
+
+
+# Singleton instance
+_pool_instance = None
+
+def get_llm_pool() -> LLMPool:
+    """Get or create the LLM pool instance"""
+    global _pool_instance
+    if _pool_instance is None:
+        _pool_instance = LLMPool()
+    return _pool_instance
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.chatbot import CustomerServiceBot
+    from src.conversations import ConversationManager
+    
+    n_alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency, timeout = 0.2, 1.0
+    print(f"=== ALERT GENERATION BENCHMARK: {n_alerts} alerts, mock latency {latency * 1e3:.0f}ms, "
+          f"1 in 25 calls hangs, {timeout:.0f}s deadline ===")
+    
+    alerts = [{
+        'vehicle_id': f"V-{i:04d}",
+        'owner_name': f"Owner {i}",
+        'diagnosis_report': {'status': 'Critical' if i % 3 else 'High', 'issues': ['Brake pads worn'],
+                             'recommendation': 'Book a brake service'}
+    } for i in range(n_alerts)]
+    
+    # Serial baseline: one blocking call at a time (estimated from a sample)
+    sample = 10
+    serial_pool = LLMPool(client=AsyncStubChatClient(latency=latency), max_concurrency=1, timeout=timeout)
+    bot = CustomerServiceBot(conversations=ConversationManager(persist=False), pool=serial_pool)
+    start = time.perf_counter()
+    bot.generate_alerts(alerts[:sample])
+    serial_secs = (time.perf_counter() - start) / sample * n_alerts
+    print(f"serial (est.)   : {serial_secs:7.2f}s")
+    
+    for concurrency in (16, 64):
+        client = AsyncStubChatClient(latency=latency, jitter=0.1, slow_every=25)
+        pool = LLMPool(client=client, max_concurrency=concurrency, timeout=timeout)
+        bot = CustomerServiceBot(conversations=ConversationManager(persist=False), pool=pool)
+        start = time.perf_counter()
+        messages = bot.generate_alerts(alerts)
+        elapsed = time.perf_counter() - start
+        stats = pool.get_stats()
+        print(f"concurrency {concurrency:>3} : {elapsed:7.2f}s  ({n_alerts / elapsed:6.1f} alerts/s, "
+              f"peak in flight {client.peak_in_flight}, timeouts {stats['timeouts']} -> template fallback)")
+        assert len(messages) == n_alerts and all(messages)
+        pool.close()
@@ -0,0 +1,287 @@
+"""
+Localization Catalog
+Precomputed translations of customer alerts and chatbot fallback replies
+"""
+
+from typing import Callable, Dict
+
+DEFAULT_LANGUAGE = 'en'
+
+SUPPORTED_LANGUAGES = {
+    'en': 'English',
+    'hi': 'Hindi',
+    'te': 'Telugu',
+    'ta': 'Tamil',
+}
+
+# Labels shown by the dashboard's language selector
+LANGUAGE_LABELS = {
+    'English': 'en',
+    'हिंदी (Hindi)': 'hi',
+    'తెలుగు (Telugu)': 'te',
+    'தமிழ் (Tamil)': 'ta',
+}
+
+# --- ALERTS ---
+# Greeting per severity tier; any other severity uses 'default'
+ALERT_GREETINGS = {
+    'en': {
+        'Critical': "⚠️ CRITICAL ALERT for {owner_name}",
+        'High': "⚠️ Important Notice for {owner_name}",
+        'default': "Hello {owner_name}",
+    },
+    'hi': {
+        'Critical': "⚠️ {owner_name} के लिए गंभीर अलर्ट",
+        'High': "⚠️ {owner_name} के लिए महत्वपूर्ण सूचना",
+        'default': "नमस्ते {owner_name}",
+    },
+    'te': {
+        'Critical': "⚠️ {owner_name} గారికి తీవ్రమైన హెచ్చరిక",
+        'High': "⚠️ {owner_name} గారికి ముఖ్యమైన సూచన",
+        'default': "నమస్కారం {owner_name}",
+    },
+    'ta': {
+        'Critical': "⚠️ {owner_name} அவர்களுக்கு அவசர எச்சரிக்கை",
+        'High': "⚠️ {owner_name} அவர்களுக்கு முக்கிய அறிவிப்பு",
+        'default': "வணக்கம் {owner_name}",
+    },
+}
+
+ALERT_BODIES = {
+    'en': """{greeting},
+
+We've detected the following issue(s) with your vehicle ({vehicle_id}):
+
+{issues_text}
+
+Recommendation: {recommendation}
+
+Please reply to schedule a service appointment or if you have any questions.
+
+- AutoGuard Support Team""",
+    'hi': """{greeting},
+
+हमने आपके वाहन ({vehicle_id}) में निम्नलिखित समस्या(एँ) पाई हैं:
+
+{issues_text}
+
+सुझाव: {recommendation}
+
+सर्विस अपॉइंटमेंट बुक करने या किसी भी प्रश्न के लिए कृपया उत्तर दें।
+
+- AutoGuard सहायता टीम""",
+    'te': """{greeting},
+
+మీ వాహనం ({vehicle_id})లో కింది సమస్య(లు) గుర్తించాము:
+
+{issues_text}
+
+సిఫార్సు: {recommendation}
+
+సర్వీస్ అపాయింట్‌మెంట్ బుక్ చేయడానికి లేదా ఏవైనా ప్రశ్నలు ఉంటే దయచేసి సమాధానం ఇవ్వండి.
+
+- AutoGuard సహాయ బృందం""",
+    'ta': """{greeting},
+
+உங்கள் வாகனத்தில் ({vehicle_id}) பின்வரும் சிக்கல்(கள்) கண்டறியப்பட்டுள்ளன:
+
+{issues_text}
+
+பரிந்துரை: {recommendation}
+
+சர்வீஸ் சந்திப்பை முன்பதிவு செய்ய அல்லது ஏதேனும் கேள்விகள் இருந்தால் தயவுசெய்து பதிலளிக்கவும்.
+
+- AutoGuard ஆதரவு குழு""",
+}
+
+NO_ISSUES_TEXT = {
+    'en': "General maintenance required",
+    'hi': "सामान्य रखरखाव आवश्यक है",
+    'te': "సాధారణ నిర్వహణ అవసరం",
+    'ta': "பொது பராமரிப்பு தேவை",
+}
+
+DEFAULT_RECOMMENDATION = {
+    'en': "Please contact service.",
+    'hi': "कृपया सर्विस सेंटर से संपर्क करें।",
+    'te': "దయచేసి సర్వీస్ కేంద్రాన్ని సంప్రదించండి.",
+    'ta': "தயவுசெய்து சர்வீஸ் மையத்தைத் தொடர்பு கொள்ளவும்.",
+}
+
+# --- FALLBACK REPLIES ---
+# One entry per reply of the rule-based responder; 'explain_issue' takes {issue}
+FALLBACK_REPLIES = {
+    'en': {
+        'booking': ("I've scheduled a service appointment for you tomorrow at 10:00 AM. "
+                    "You'll receive a confirmation SMS shortly. Is there anything else I can help with?"),
+        'explain_issue': ("The diagnostic system detected: {issue}. "
+                          "This requires immediate attention to ensure your safety. "
+                          "Would you like me to schedule a service appointment?"),
+        'explain_generic': ("Our diagnostic system has flagged a potential issue with your vehicle. "
+                            "I recommend scheduling a service check. Would you like me to book an appointment?"),
+        'cost': ("Service costs vary depending on the repair needed. Our technician will provide a detailed quote "
+                 "after inspection. The diagnostic check is complimentary. Would you like to proceed with booking?"),
+        'urgency_critical': ("This is a critical safety issue. We strongly advise NOT driving the vehicle. "
+                             "I can arrange emergency roadside assistance or towing. Should I proceed?"),
+        'urgency': ("We have slots available as early as tomorrow morning. "
+                    "Would you like me to book the earliest available time?"),
+        'thanks': ("You're welcome! Your appointment is confirmed. "
+                   "We'll send you a reminder 24 hours before. Drive safely!"),
+        'decline': "No problem. Feel free to reach out whenever you're ready. Stay safe!",
+        'menu': ("I'm here to help with your vehicle service needs. Would you like to:\n"
+                 "1. Schedule a service appointment\n"
+                 "2. Learn more about the detected issue\n"
+                 "3. Speak with a technician\n"
+                 "Please let me know how I can assist you."),
+    },
+    'hi': {
+        'booking': ("मैंने आपके लिए कल सुबह 10:00 बजे सर्विस अपॉइंटमेंट तय कर दिया है। "
+                    "आपको जल्द ही पुष्टि का SMS मिलेगा। क्या मैं आपकी और कोई मदद कर सकता हूँ?"),
+        'explain_issue': ("डायग्नोस्टिक सिस्टम ने पाया है: {issue}। "
+                          "आपकी सुरक्षा के लिए इस पर तुरंत ध्यान देना ज़रूरी है। "
+                          "क्या मैं आपके लिए सर्विस अपॉइंटमेंट बुक कर दूँ?"),
+        'explain_generic': ("हमारे डायग्नोस्टिक सिस्टम ने आपके वाहन में एक संभावित समस्या पाई है। "
+                            "मेरा सुझाव है कि आप सर्विस जाँच करवा लें। क्या मैं अपॉइंटमेंट बुक कर दूँ?"),
+        'cost': ("सर्विस की लागत आवश्यक मरम्मत पर निर्भर करती है। जाँच के बाद हमारे तकनीशियन आपको विस्तृत अनुमान देंगे। "
+                 "डायग्नोस्टिक जाँच निःशुल्क है। क्या आप बुकिंग जारी रखना चाहेंगे?"),
+        'urgency_critical': ("यह एक गंभीर सुरक्षा समस्या है। हमारी सख्त सलाह है कि वाहन न चलाएँ। "
+                             "मैं आपातकालीन सड़क सहायता या टोइंग की व्यवस्था कर सकता हूँ। क्या मैं आगे बढ़ूँ?"),
+        'urgency': "हमारे पास कल सुबह से ही स्लॉट उपलब्ध हैं। क्या मैं सबसे पहला उपलब्ध समय बुक कर दूँ?",
+        'thanks': ("आपका स्वागत है! आपकी अपॉइंटमेंट की पुष्टि हो गई है। "
+                   "हम 24 घंटे पहले आपको रिमाइंडर भेजेंगे। सुरक्षित ड्राइव करें!"),
+        'decline': "कोई बात नहीं। जब भी आप तैयार हों, बेझिझक संपर्क करें। सुरक्षित रहें!",
+        'menu': ("मैं आपके वाहन की सर्विस से जुड़ी ज़रूरतों में मदद के लिए यहाँ हूँ। क्या आप:\n"
+                 "1. सर्विस अपॉइंटमेंट बुक करना चाहेंगे\n"
+                 "2. पाई गई समस्या के बारे में और जानना चाहेंगे\n"
+                 "3. किसी तकनीशियन से बात करना चाहेंगे\n"
+                 "कृपया बताएँ कि मैं आपकी कैसे मदद कर सकता हूँ।"),
+    },
+    'te': {
+        'booking': ("మీ కోసం రేపు ఉదయం 10:00 గంటలకు సర్వీస్ అపాయింట్‌మెంట్ షెడ్యూల్ చేశాను. "
+                    "త్వరలో మీకు నిర్ధారణ SMS వస్తుంది. ఇంకా ఏమైనా సహాయం కావాలా?"),
+        'explain_issue': ("డయాగ్నస్టిక్ సిస్టమ్ గుర్తించింది: {issue}. "
+                          "మీ భద్రత కోసం దీనిపై వెంటనే దృష్టి పెట్టాలి. "
+                          "మీ కోసం సర్వీస్ అపాయింట్‌మెంట్ బుక్ చేయమంటారా?"),
+        'explain_generic': ("మా డయాగ్నస్టిక్ సిస్టమ్ మీ వాహనంలో ఒక సంభావ్య సమస్యను గుర్తించింది. "
+                            "సర్వీస్ తనిఖీ చేయించుకోవాలని సూచిస్తున్నాను. అపాయింట్‌మెంట్ బుక్ చేయమంటారా?"),
+        'cost': ("సర్వీస్ ఖర్చు అవసరమైన మరమ్మతుపై ఆధారపడి ఉంటుంది. తనిఖీ తర్వాత మా టెక్నీషియన్ వివరమైన అంచనా ఇస్తారు. "
+                 "డయాగ్నస్టిక్ తనిఖీ ఉచితం. బుకింగ్ కొనసాగించమంటారా?"),
+        'urgency_critical': ("ఇది తీవ్రమైన భద్రతా సమస్య. వాహనాన్ని నడపవద్దని గట్టిగా సూచిస్తున్నాము. "
+                             "అత్యవసర రోడ్‌సైడ్ సహాయం లేదా టోయింగ్ ఏర్పాటు చేయగలను. కొనసాగించమంటారా?"),
+        'urgency': "రేపు ఉదయం నుంచే స్లాట్లు అందుబాటులో ఉన్నాయి. అందుబాటులో ఉన్న మొదటి సమయాన్ని బుక్ చేయమంటారా?",
+        'thanks': ("స్వాగతం! మీ అపాయింట్‌మెంట్ నిర్ధారించబడింది. "
+                   "24 గంటల ముందు మీకు రిమైండర్ పంపుతాము. సురక్షితంగా డ్రైవ్ చేయండి!"),
+        'decline': "పర్వాలేదు. మీరు సిద్ధంగా ఉన్నప్పుడు ఎప్పుడైనా సంప్రదించండి. జాగ్రత్తగా ఉండండి!",
+        'menu': ("మీ వాహన సర్వీస్ అవసరాలకు సహాయం చేయడానికి నేను ఇక్కడ ఉన్నాను. మీరు వీటిలో ఏది కోరుకుంటున్నారు:\n"
+                 "1. సర్వీస్ అపాయింట్‌మెంట్ బుక్ చేయడం\n"
+                 "2. గుర్తించిన సమస్య గురించి మరింత తెలుసుకోవడం\n"
+                 "3. టెక్నీషియన్‌తో మాట్లాడటం\n"
+                 "నేను ఎలా సహాయం చేయగలనో దయచేసి తెలియజేయండి."),
+    },
+    'ta': {
+        'booking': ("உங்களுக்காக நாளை காலை 10:00 மணிக்கு சர்வீஸ் சந்திப்பை பதிவு செய்துள்ளேன். "
+                    "விரைவில் உறுதிப்படுத்தல் SMS வரும். வேறு ஏதாவது உதவி வேண்டுமா?"),
+        'explain_issue': ("கண்டறிதல் அமைப்பு இதைக் கண்டறிந்துள்ளது: {issue}. "
+                          "உங்கள் பாதுகாப்பிற்காக இதற்கு உடனடி கவனம் தேவை. "
+                          "உங்களுக்காக சர்வீஸ் சந்திப்பை பதிவு செய்யட்டுமா?"),
+        'explain_generic': ("எங்கள் கண்டறிதல் அமைப்பு உங்கள் வாகனத்தில் ஒரு சாத்தியமான சிக்கலைக் கண்டறிந்துள்ளது. "
+                            "சர்வீஸ் பரிசோதனை செய்யுமாறு பரிந்துரைக்கிறேன். சந்திப்பை பதிவு செய்யட்டுமா?"),
+        'cost': ("சர்வீஸ் செலவு தேவையான பழுதுபார்ப்பைப் பொறுத்தது. பரிசோதனைக்குப் பிறகு எங்கள் தொழில்நுட்ப வல்லுநர் "
+                 "விரிவான மதிப்பீட்டை வழங்குவார். கண்டறிதல் பரிசோதனை இலவசம். முன்பதிவைத் தொடரலாமா?"),
+        'urgency_critical': ("இது ஒரு கடுமையான பாதுகாப்புச் சிக்கல். வாகனத்தை ஓட்ட வேண்டாம் என்று உறுதியாக அறிவுறுத்துகிறோம். "
+                             "அவசர சாலையோர உதவி அல்லது இழுவை வாகனத்தை ஏற்பாடு செய்ய முடியும். தொடரட்டுமா?"),
+        'urgency': "நாளை காலை முதலே நேர இடங்கள் உள்ளன. கிடைக்கும் முதல் நேரத்தை பதிவு செய்யட்டுமா?",
+        'thanks': ("மிக்க மகிழ்ச்சி! உங்கள் சந்திப்பு உறுதி செய்யப்பட்டது. "
+                   "24 மணி நேரத்திற்கு முன் நினைவூட்டல் அனுப்புவோம். பாதுகாப்பாக ஓட்டுங்கள்!"),
+        'decline': "பரவாயில்லை. நீங்கள் தயாரானதும் எப்போது வேண்டுமானாலும் தொடர்பு கொள்ளுங்கள். பாதுகாப்பாக இருங்கள்!",
+        'menu': ("உங்கள் வாகன சர்வீஸ் தேவைகளுக்கு உதவ நான் இங்கே இருக்கிறேன். நீங்கள் விரும்புவது:\n"
+                 "1. சர்வீஸ் சந்திப்பை பதிவு செய்தல்\n"
+                 "2. கண்டறியப்பட்ட சிக்கலைப் பற்றி மேலும் அறிதல்\n"
+                 "3. தொழில்நுட்ப வல்லுநருடன் பேசுதல்\n"
+                 "நான் எப்படி உதவ முடியும் என்று தயவுசெய்து தெரிவிக்கவும்."),
+    },
+}
+
+# --- INTENTS ---
+# Keywords per intent for the rule-based responder, intents in priority order
+# (earliest wins). Keywords are whole words or two-word phrases, and a phrase
+# takes precedence over its own words; common inflections are listed explicitly. Other languages are matched together
+# with the English table, since customers often mix in English words.
+INTENT_KEYWORDS = {
+    'en': [
+        ('booking', ['book', 'booking', 'booked', 'schedule', 'scheduled', 'scheduling', 'appointment',
+                     'appointments', 'service', 'services', 'servicing', 'fix', 'fixed', 'fixing']),
+        # Cost ranks above explain (behaviour change from the old substring scans, which
+        # ranked explain first), so "what's the price?" gets the cost reply
+        ('cost', ['cost', 'costs', 'price', 'prices', 'pricing', 'how much', 'charge', 'charges', 'fee', 'fees']),
+        ('explain', ['what', "what's", 'why', 'how', 'explain', 'explained', 'explanation',
+                     'issue', 'issues', 'problem', 'problems']),
+        ('urgency', ['urgent', 'urgently', 'now', 'immediately', 'wait', 'how long']),
+        ('thanks', ['thank', 'thanks', 'thankyou', 'ok', 'okay', 'yes', 'sure', 'great']),
+        ('decline', ['cancel', 'cancelled', 'canceled', 'cancellation', 'no', 'later', 'not now']),
+    ],
+    'hi': [
+        ('booking', ['बुक', 'बुकिंग', 'अपॉइंटमेंट', 'अपॉइंटमेंट्स', 'सर्विस', 'सर्विसिंग', 'शेड्यूल', 'मरम्मत']),
+        ('cost', ['खर्च', 'खर्चा', 'कीमत', 'दाम', 'लागत', 'शुल्क', 'फीस', 'कितना', 'कितने']),
+        ('explain', ['क्या', 'क्यों', 'कैसे', 'समस्या', 'दिक्कत', 'मतलब', 'समझाइए', 'समझाएं', 'बताइए']),
+        ('urgency', ['तुरंत', 'अभी', 'जल्दी', 'इंतजार', 'इंतज़ार', 'कब तक', 'कितनी देर']),
+        ('thanks', ['धन्यवाद', 'शुक्रिया', 'हां', 'हाँ', 'ठीक', 'अच्छा', 'ज़रूर', 'जरूर']),
+        ('decline', ['रद्द', 'नहीं', 'बाद', 'कैंसल']),
+    ],
+    'te': [
+        ('booking', ['బుక్', 'బుకింగ్', 'అపాయింట్‌మెంట్', 'అపాయింట్మెంట్', 'సర్వీస్', 'సర్వీసింగ్', 'షెడ్యూల్',
+                     'రిపేర్', 'మరమ్మతు']),
+        ('cost', ['ఖర్చు', 'ధర', 'ఫీజు', 'ఛార్జ్', 'ఎంత', 'ఎంతవుతుంది']),
+        ('explain', ['ఏమిటి', 'ఏంటి', 'ఎందుకు', 'ఎలా', 'సమస్య', 'అర్థం', 'వివరించండి']),
+        ('urgency', ['వెంటనే', 'ఇప్పుడే', 'ఇప్పుడు', 'అత్యవసరం', 'ఎంతసేపు']),
+        ('thanks', ['ధన్యవాదాలు', 'థాంక్స్', 'సరే', 'అవును', 'మంచిది']),
+        ('decline', ['రద్దు', 'వద్దు', 'కాదు', 'తర్వాత', 'క్యాన్సిల్']),
+    ],
+    'ta': [
+        ('booking', ['புக்', 'புக்கிங்', 'பதிவு', 'முன்பதிவு', 'சந்திப்பு', 'சந்திப்பை', 'சர்வீஸ்', 'பழுது']),
+        ('cost', ['செலவு', 'விலை', 'கட்டணம்', 'எவ்வளவு']),
+        ('explain', ['என்ன', 'ஏன்', 'எப்படி', 'பிரச்சனை', 'பிரச்சினை', 'சிக்கல்', 'விளக்கவும்', 'அர்த்தம்']),
+        ('urgency', ['உடனே', 'உடனடியாக', 'இப்போது', 'அவசரம்']),
+        ('thanks', ['நன்றி', 'சரி', 'ஆம்', 'ஆமாம்', 'நல்லது']),
+        ('decline', ['ரத்து', 'வேண்டாம்', 'இல்லை', 'பிறகு', 'கேன்சல்']),
+    ],
+}
+
+
+def resolve_language(language: str = None) -> str:
+    """Map a language code, English name or selector label to a supported code (default English)"""
+    if not language:
+        return DEFAULT_LANGUAGE
+    if language in SUPPORTED_LANGUAGES:
+        return language
+    if language in LANGUAGE_LABELS:
+        return LANGUAGE_LABELS[language]
+    by_name = {name.lower(): code for code, name in SUPPORTED_LANGUAGES.items()}
+    return by_name.get(language.strip().lower(), DEFAULT_LANGUAGE)
+
+
+def _compile_replies() -> Dict[str, Dict[str, Callable[..., str]]]:
+    """
+    Check every language covers every reply and bind each entry once:
+    plain strings become constant lookups, templates their own str.format
+    """
+    expected = set(FALLBACK_REPLIES[DEFAULT_LANGUAGE])
+    compiled = {}
+    for language, replies in FALLBACK_REPLIES.items():
+        missing = expected - set(replies)
+        if missing:
+            raise ValueError(f"Fallback replies for '{language}' are missing: {sorted(missing)}")
+        compiled[language] = {
+            key: (text.format if '{' in text else (lambda text=text, **_: text))
+            for key, text in replies.items()
+        }
+    return compiled
+
+
+_REPLIES = _compile_replies()
+
+
+def fallback_reply(key: str, language: str = DEFAULT_LANGUAGE, **slots) -> str:
+    """A rule-based reply in the requested language (English if unsupported)"""
+    replies = _REPLIES.get(language) or _REPLIES[DEFAULT_LANGUAGE]
+    return replies[key](**slots)
@@ -0,0 +1,256 @@
+"""
+LLM Response Cache
+Reuses chatbot replies for repeated questions asked in the same diagnostic context
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.localization import resolve_language
+
+CACHE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'response_cache.db')
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("How much?? " == "how much")"""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", message.lower())).strip()
+
+
+def context_fingerprint(context: Optional[dict]) -> str:
+    """Vehicle, reply language, severity and the sorted issue list: everything the system prompt takes from context"""
+    context = context or {}
+    diagnosis = context.get('diagnosis_report') or {}
+    return json.dumps([context.get('vehicle_id', 'Unknown'), resolve_language(context.get('language')),
+                       diagnosis.get('status', 'Normal'), sorted(diagnosis.get('issues') or [])])
+
+
+def conversation_digest(history: Optional[List[Dict[str, str]]] = None, summary: Optional[str] = None) -> str:
+    """
+    Hash of the earlier turns and rolling summary sent with the message
+    
+    A trailing user turn is the message being answered (keyed separately,
+    normalized), so it is left out.
+    """
+    turns = list(history or [])
+    if turns and turns[-1].get('role') == 'user':
+        turns.pop()
+    raw = json.dumps([summary, [(m.get('role'), m.get('content')) for m in turns]], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM replies keyed by (normalized message, context
+    fingerprint, conversation digest).
+    
+    The key covers everything the LLM prompt is built from (vehicle, reply
+    language, diagnosis, earlier turns and the rolling summary), so a reply
+    that refers to one customer's vehicle or booking is only ever reused for
+    an identical prompt. In practice hits come from opening questions asked
+    in many sessions about the same vehicle state.
+
+    The memory tier is an OrderedDict LRU capped at max_entries. The optional
+    disk tier is a small SQLite table, so answers survive restarts and are
+    shared by every dashboard process on the host; a disk hit is promoted
+    back into memory. Entries older than ttl_seconds are treated as misses
+    in both tiers.
+    """
+    
+    DEFAULT_TTL = 6 * 3600  # Seconds
+    DEFAULT_MAX_ENTRIES = 1024
+    
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL,
+                 disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(disk_path)
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+            ''')
+            conn.commit()
+            conn.close()
+    
+    @staticmethod
+    def make_key(message: str, context: Optional[dict] = None, history: Optional[List[Dict[str, str]]] = None,
+                 summary: Optional[str] = None) -> str:
+        raw = "\x1f".join((normalize_message(message), context_fingerprint(context),
+                           conversation_digest(history, summary)))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, message: str, context: Optional[dict] = None, history: Optional[List[Dict[str, str]]] = None,
+            summary: Optional[str] = None) -> Optional[str]:
+        """Cached reply for this message, context and conversation so far, or None"""
+        key = self.make_key(message, context, history, summary)
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+        
+        if self.disk_path:
+            row = self._disk_get(key)
+            if row is not None and now - row[0] <= self.ttl_seconds:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return row[1]
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def put(self, message: str, context: Optional[dict], response: str,
+            history: Optional[List[Dict[str, str]]] = None, summary: Optional[str] = None):
+        key = self.make_key(message, context, history, summary)
+        created = time.time()
+        self._remember(key, created, response)
+        if self.disk_path:
+            try:
+                conn = sqlite3.connect(self.disk_path)
+                conn.execute('INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)',
+                             (key, response, created))
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"[ResponseCache] Disk write failed: {e}")
+    
+    def _remember(self, key: str, created: float, response: str):
+        with self._lock:
+            self._entries[key] = (created, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        try:
+            conn = sqlite3.connect(self.disk_path)
+            row = conn.execute('SELECT created, response FROM responses WHERE key = ?', (key,)).fetchone()
+            conn.close()
+            return row
+        except sqlite3.Error as e:
+            print(f"[ResponseCache] Disk read failed: {e}")
+            return None
+    
+    def purge_expired(self) -> int:
+        """Drop expired entries from both tiers; returns how many memory entries went"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [key for key, (created, _) in self._entries.items() if created < cutoff]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+        if self.disk_path:
+            conn = sqlite3.connect(self.disk_path)
+            conn.execute('DELETE FROM responses WHERE created < ?', (cutoff,))
+            conn.commit()
+            conn.close()
+        return len(expired)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            conn = sqlite3.connect(self.disk_path)
+            conn.execute('DELETE FROM responses')
+            conn.commit()
+            conn.close()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+# Singleton instance
+_cache_instance = None
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the response cache instance (disk tier under data/)"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = ResponseCache(disk_path=CACHE_DB_PATH)
+    return _cache_instance
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import random
+    import tempfile
+    
+    from src.chatbot import CustomerServiceBot, StubChatClient
+    from src.conversations import ConversationManager
+    
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = 0.02
+    print(f"=== RESPONSE CACHE BENCHMARK: {n_messages:,} messages, stub LLM latency {latency * 1e3:.0f}ms ===")
+    
+    questions = ["How much will it cost?", "how much will it cost", "Why is this urgent?",
+                 "Can you book me in tomorrow?", "What does brake wear mean?", "Is it safe to drive?"]
+    contexts = [
+        {'vehicle_id': 'V-005', 'diagnosis_report': {'status': 'Critical', 'issues': ['Brake pads critically worn (2.1mm)']}},
+        {'vehicle_id': 'V-011', 'diagnosis_report': {'status': 'High', 'issues': ['Battery voltage low (11.8V)']}},
+        {'vehicle_id': 'V-020', 'diagnosis_report': {'status': 'Normal', 'issues': []}},
+    ]
+    rng = random.Random(7)
+    workload = [(rng.choice(questions), rng.choice(contexts)) for _ in range(n_messages)]
+    
+    results = {}
+    # A zero-size cache misses every lookup, giving the uncached baseline
+    for label, cache in [("uncached", ResponseCache(max_entries=0)),
+                         ("cached", ResponseCache(disk_path=os.path.join(tempfile.mkdtemp(), 'cache.db')))]:
+        client = StubChatClient(latency=latency)
+        bot = CustomerServiceBot(conversations=ConversationManager(persist=False), client=client, cache=cache)
+        start = time.perf_counter()
+        # Each customer opens a fresh chat, so only the first turn repeats across sessions
+        for i, (question, context) in enumerate(workload):
+            bot.chat(question, context, session_id=f"s{i}")
+        results[label] = time.perf_counter() - start
+        print(f"{label:<9}: {results[label]:7.2f}s  LLM calls {client.calls:>6,}")
+        print(f"           hit rate {cache.get_stats()['hit_rate']:.1%}")
+    
+    print(f"Speedup  : {results['uncached'] / results['cached']:.1f}x")
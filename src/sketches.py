@@ -0,0 +1,334 @@
+"""
+Quantile Sketches
+Mergeable streaming percentiles for telemetry signals, fleet-wide and per manufacturer
+"""
+
+import math
+import threading
+from typing import List, Dict, Optional, Sequence
+
+import numpy as np
+
+# Signals ops tracks percentiles for
+DISTRIBUTION_SIGNALS = ('coolant_temp_c', 'battery_voltage_v', 'brake_pad_thickness_mm')
+
+FLEET_GROUP = 'Fleet'
+
+
+class QuantileSketch:
+    """
+    DDSketch-style quantile sketch with relative-error guarantees.
+
+    Each positive value v lands in bucket ceil(log_gamma(v)), where
+    gamma = (1 + a) / (1 - a). Any quantile read back is then within relative
+    error a of the true value, and memory grows with the logarithm of the
+    value range rather than with the sample count. Zeros are counted
+    separately and negative values use a mirrored set of buckets.
+
+    Two sketches with the same accuracy merge by adding bucket counts, so
+    per-worker sketches combine exactly, in any order. Queries run a
+    searchsorted over a cumulative-count array that is cached until the next
+    update. Their cost depends on the number of buckets, which is bounded by
+    the value range, not on the number of samples.
+    """
+    
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._index = None
+    
+    def _bucket_counts(self, magnitudes: np.ndarray, store: Dict[int, int]):
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        lowest = int(keys.min())
+        counts = np.bincount(keys - lowest)
+        for offset in np.flatnonzero(counts).tolist():
+            store[lowest + offset] = store.get(lowest + offset, 0) + int(counts[offset])
+    
+    def add(self, value: float):
+        self.add_many([value])
+    
+    def add_many(self, values):
+        """Add a batch of values (NaN is ignored)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        
+        positive = values > 0
+        negative = values < 0
+        if positive.any():
+            self._bucket_counts(values[positive], self.positive)
+        if negative.any():
+            self._bucket_counts(-values[negative], self.negative)
+        self.zero_count += int(len(values) - positive.sum() - negative.sum())
+        
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._index = None
+    
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Fold another sketch (same accuracy) into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, n in other_store.items():
+                store[key] = store.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._index = None
+        return self
+    
+    def _build_index(self):
+        """Representative values in ascending order with cumulative counts"""
+        neg_keys = sorted(self.negative, reverse=True)
+        pos_keys = sorted(self.positive)
+        # Bucket k covers (gamma^(k-1), gamma^k]; 2*gamma^k/(gamma+1) is its relative midpoint
+        scale = 2.0 / (self.gamma + 1.0)
+        values = (
+            [-scale * self.gamma ** k for k in neg_keys]
+            + ([0.0] if self.zero_count else [])
+            + [scale * self.gamma ** k for k in pos_keys]
+        )
+        counts = (
+            [self.negative[k] for k in neg_keys]
+            + ([self.zero_count] if self.zero_count else [])
+            + [self.positive[k] for k in pos_keys]
+        )
+        self._index = (np.array(values), np.cumsum(counts))
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q in [0, 1], or None when empty"""
+        if self.count == 0:
+            return None
+        if self._index is None:
+            self._build_index()
+        values, cumulative = self._index
+        rank = q * (self.count - 1)
+        i = int(np.searchsorted(cumulative, rank, side='right'))
+        # Exact extremes are tracked, so never report beyond them
+        return float(min(max(values[min(i, len(values) - 1)], self.min), self.max))
+    
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        return [self.quantile(q) for q in qs]
+    
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+    
+    def to_dict(self) -> Dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'positive': {str(k): v for k, v in self.positive.items()},
+            'negative': {str(k): v for k, v in self.negative.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls(data.get('relative_accuracy', 0.01))
+        sketch.positive = {int(k): v for k, v in data.get('positive', {}).items()}
+        sketch.negative = {int(k): v for k, v in data.get('negative', {}).items()}
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.count = data.get('count', 0)
+        sketch.sum = data.get('sum', 0.0)
+        sketch.min = data['min'] if data.get('min') is not None else math.inf
+        sketch.max = data['max'] if data.get('max') is not None else -math.inf
+        return sketch
+
+
+class FleetDistributions:
+    """
+    One QuantileSketch per (signal, group), where group is FLEET_GROUP or a make.
+
+    Telemetry is folded in as it is ingested. A vehicle's snapshot is counted
+    once: samples not newer than the last one seen for that vehicle are
+    skipped, so the dashboard can re-ingest vehicles.json on every rerun.
+    Instances built in separate worker processes combine with merge().
+    """
+    
+    def __init__(self, signals: Sequence[str] = DISTRIBUTION_SIGNALS, relative_accuracy: float = 0.01):
+        self.signals = list(signals)
+        self.relative_accuracy = relative_accuracy
+        self.sketches: Dict[str, Dict[str, QuantileSketch]] = {signal: {} for signal in self.signals}
+        self.last_seen: Dict[str, str] = {}
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        # Picklable for ProcessPoolExecutor workers; the lock is per process
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def _sketch(self, signal: str, group: str) -> QuantileSketch:
+        sketch = self.sketches[signal].get(group)
+        if sketch is None:
+            sketch = self.sketches[signal][group] = QuantileSketch(self.relative_accuracy)
+        return sketch
+    
+    def ingest(self, groups: Sequence[str], values: Dict[str, Sequence[float]]):
+        """Fold a batch of samples in; groups gives each sample's make"""
+        # Factorize groups once, then each group is one contiguous slice
+        names: Dict[str, int] = {}
+        codes = np.fromiter((names.setdefault(g, len(names)) for g in groups), dtype=np.int64, count=len(groups))
+        order = np.argsort(codes, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(names)))]
+        
+        with self._lock:
+            for signal in self.signals:
+                if signal not in values:
+                    continue
+                column = np.asarray(values[signal], dtype=np.float64)
+                self._sketch(signal, FLEET_GROUP).add_many(column)
+                grouped = column[order]
+                for group, code in names.items():
+                    self._sketch(signal, group).add_many(grouped[bounds[code]:bounds[code + 1]])
+    
+    def ingest_vehicles(self, vehicles: List[Dict]) -> int:
+        """
+        Fold the current telemetry of a fleet listing in; returns samples accepted
+
+        Accepts raw vehicles.json records or the dashboard's flattened records.
+        """
+        groups = []
+        values = {signal: [] for signal in self.signals}
+        
+        for vehicle in vehicles:
+            telematics = vehicle.get('telematics')
+            if not telematics:
+                continue
+            timestamp = vehicle.get('telemetry_timestamp') or vehicle.get('metadata', {}).get('timestamp') or ''
+            vehicle_id = vehicle['vehicle_id']
+            # ISO-8601 timestamps compare correctly as strings
+            if vehicle_id in self.last_seen and timestamp <= self.last_seen[vehicle_id]:
+                continue
+            self.last_seen[vehicle_id] = timestamp
+            
+            groups.append(vehicle.get('make') or vehicle.get('metadata', {}).get('make', 'Unknown'))
+            for signal in self.signals:
+                values[signal].append(telematics.get(signal, np.nan))
+        
+        if groups:
+            self.ingest(groups, values)
+        return len(groups)
+    
+    def merge(self, other: 'FleetDistributions') -> 'FleetDistributions':
+        with self._lock:
+            for signal, groups in other.sketches.items():
+                if signal not in self.sketches:
+                    self.signals.append(signal)
+                    self.sketches[signal] = {}
+                for group, sketch in groups.items():
+                    self._sketch(signal, group).merge(sketch)
+            for vehicle_id, timestamp in other.last_seen.items():
+                if timestamp > self.last_seen.get(vehicle_id, ''):
+                    self.last_seen[vehicle_id] = timestamp
+        return self
+    
+    def groups(self) -> List[str]:
+        names = {group for sketches in self.sketches.values() for group in sketches}
+        return [FLEET_GROUP] + sorted(names - {FLEET_GROUP}) if names else []
+    
+    def percentiles(self, signal: str, group: str = FLEET_GROUP,
+                    qs: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict:
+        """{'count', 'mean', 'p50', 'p95', 'p99', ...} for one signal and group"""
+        sketch = self.sketches.get(signal, {}).get(group)
+        if sketch is None or sketch.count == 0:
+            return {'count': 0}
+        stats = {'count': sketch.count, 'mean': round(sketch.mean(), 3)}
+        for q, value in zip(qs, sketch.quantiles(qs)):
+            stats[f"p{round(q * 100, 1):g}"] = round(value, 3)
+        return stats
+    
+    def summary(self, qs: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict[str, Dict]]:
+        """signal -> group -> percentile stats"""
+        return {
+            signal: {group: self.percentiles(signal, group, qs) for group in self.groups()
+                     if group in self.sketches[signal]}
+            for signal in self.signals
+        }
+
+
+# Singleton instance
+_distributions_instance = None
+
+def get_fleet_distributions() -> FleetDistributions:
+    """Get or create the fleet distributions instance"""
+    global _distributions_instance
+    if _distributions_instance is None:
+        _distributions_instance = FleetDistributions()
+    return _distributions_instance
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import pickle
+    import sys
+    import time
+    
+    n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    n_workers = 4
+    print(f"=== QUANTILE SKETCH BENCHMARK: {n_samples:,} samples across {n_workers} workers ===")
+    
+    rng = np.random.default_rng(3)
+    makes = np.array(['Tesla', 'Toyota', 'Ford', 'Honda', 'Hyundai'], dtype=object)
+    groups = makes[rng.integers(0, len(makes), n_samples)]
+    values = {
+        'coolant_temp_c': rng.normal(92, 6, n_samples),
+        'battery_voltage_v': rng.normal(12.6, 0.4, n_samples),
+        'brake_pad_thickness_mm': rng.gamma(4, 1.8, n_samples),
+    }
+    
+    # Each worker sketches its shard, then the pickled sketches are merged
+    start = time.perf_counter()
+    shards = np.array_split(np.arange(n_samples), n_workers)
+    partials = []
+    for shard in shards:
+        worker = FleetDistributions()
+        worker.ingest(groups[shard], {signal: column[shard] for signal, column in values.items()})
+        partials.append(pickle.dumps(worker))
+    ingest_secs = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    merged = FleetDistributions()
+    for blob in partials:
+        merged.merge(pickle.loads(blob))
+    merge_secs = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(1000):
+        merged.percentiles('coolant_temp_c', 'Tesla')
+    query_secs = (time.perf_counter() - start) / 1000
+    
+    print(f"Ingest        : {ingest_secs:8.3f}s  ({n_samples * len(values) / ingest_secs:>12,.0f} values/s)")
+    print(f"Merge         : {merge_secs * 1e3:8.2f}ms  ({sum(len(b) for b in partials) / n_workers / 1024:.1f} KiB per worker)")
+    print(f"Query         : {query_secs * 1e6:8.2f}us per percentile set")
+    
+    worst = 0.0
+    for signal, column in values.items():
+        for group in [FLEET_GROUP] + makes.tolist():
+            subset = column if group == FLEET_GROUP else column[groups == group]
+            exact = np.quantile(subset, [0.5, 0.95, 0.99], method='lower')
+            approx = merged.sketches[signal][group].quantiles([0.5, 0.95, 0.99])
+            worst = max(worst, max(abs(a - e) / abs(e) for a, e in zip(approx, exact)))
+        print(f"  {signal:<24} {merged.percentiles(signal)}")
+    print(f"Max relative error vs exact: {worst:.4%} (bound {merged.relative_accuracy:.0%})")
@@ -0,0 +1,419 @@
+"""
+Speech Cache
+Content-addressed disk cache of synthesized agent voice clips
+"""
+
+import hashlib
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.localization import resolve_language
+
+# Check if gTTS is available, otherwise no audio is produced
+try:
+    from gtts import gTTS
+    GTTS_AVAILABLE = True
+except ImportError:
+    GTTS_AVAILABLE = False
+
+AUDIO_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'audio_cache')
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def speakable(text: str) -> str:
+    """Text as it should be spoken: markdown emphasis dropped, whitespace collapsed"""
+    return _WHITESPACE.sub(" ", text.replace("*", "")).strip()
+
+
+class GTTSSynthesizer:
+    """Google Text-to-Speech (network call, roughly 0.5-2s per clip)"""
+    
+    def __init__(self, tld: str = 'com', slow: bool = False):
+        self.tld = tld
+        self.slow = slow
+        self.voice = f"gtts-{tld}{'-slow' if slow else ''}"
+    
+    def synthesize(self, text: str, language: str) -> bytes:
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=language, tld=self.tld, slow=self.slow).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class StubSynthesizer:
+    """
+    Offline stand-in for a TTS engine
+
+    Sleeps `latency` seconds per clip and returns deterministic bytes
+    derived from the text, so caching can be measured without a network.
+    """
+    
+    def __init__(self, latency: float = 0.0, voice: str = "stub"):
+        self.latency = latency
+        self.voice = voice
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def synthesize(self, text: str, language: str) -> bytes:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return b"ID3" + f"{language}:{text}".encode('utf-8')
+
+
+class SpeechCache:
+    """
+    Voice clips on disk, keyed by sha1 of (normalized text, language, voice).
+
+    The same alert text is spoken in every session, so it is synthesized
+    once and then served as a file path (Streamlit streams it from its media
+    endpoint) instead of a base64 blob inlined in the page. Files are
+    written atomically and evicted least recently used once the directory
+    exceeds max_bytes; recency is kept in the file mtime, so it survives
+    restarts and is shared with other processes on the host.
+
+    Cold clips are synthesized on a small thread pool: lookup() never blocks,
+    and a request for text already being synthesized joins the pending job
+    instead of starting another.
+    
+    prefetch() queues clips the UI will need soon (e.g. a Critical alert
+    that was just drafted) on a separate pool. An interactive miss for a
+    clip whose prefetch hasn't started yet cancels it and takes a slot on
+    the interactive pool instead, so a burst of prefetches never delays
+    it. At most max_prefetch prefetched clips may be queued or waiting for
+    their first play (older ones stop counting after PREFETCH_TTL), which
+    bounds TTS calls in a fleet-wide recall and keeps unplayed clips well
+    inside max_bytes, so prefetches don't evict each other. The first play
+    of each prefetched clip counts as a prefetch hit if it was ready, or
+    late if it wasn't.
+    """
+    
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+    DEFAULT_WORKERS = 2
+    DEFAULT_PREFETCH_WORKERS = 2
+    DEFAULT_MAX_PREFETCH = 256  # ~25MB of typical 100KB alert clips, under half of DEFAULT_MAX_BYTES
+    PREFETCH_TTL = 24 * 3600  # Seconds an unplayed prefetch counts against max_prefetch
+    
+    def __init__(self, cache_dir: str = AUDIO_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 synthesizer=None, max_workers: int = DEFAULT_WORKERS,
+                 prefetch_workers: int = DEFAULT_PREFETCH_WORKERS, max_prefetch: int = DEFAULT_MAX_PREFETCH):
+        if synthesizer is None and GTTS_AVAILABLE:
+            synthesizer = GTTSSynthesizer()
+        self.synthesizer = synthesizer
+        self.available = synthesizer is not None
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.prefetch_workers = prefetch_workers
+        self.max_prefetch = max_prefetch
+        
+        self._files: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recently used first
+        self._total_bytes = 0
+        self._pending: Dict[str, Future] = {}
+        self._prefetched: "OrderedDict[str, float]" = OrderedDict()  # Unplayed prefetched key -> time queued
+        self._queued_prefetches = set()  # Keys whose pending job is on the prefetch pool
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.errors = 0
+        self.evictions = 0
+        self.prefetched = 0
+        self.prefetch_hits = 0
+        self.prefetch_late = 0
+        self.prefetch_skipped = 0
+        self.prefetch_evicted = 0
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+    
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.mp3'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+            self._total_bytes += size
+    
+    def make_key(self, text: str, language: str = 'en') -> str:
+        voice = getattr(self.synthesizer, 'voice', '')
+        raw = "\x1f".join((speakable(text), resolve_language(language), voice))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.mp3')
+    
+    def _cached_path(self, key: str) -> Optional[str]:
+        """Path of a cached clip, marked most recently used; None if absent (caller holds the lock)"""
+        if key not in self._files:
+            return None
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:  # Deleted behind our back
+            self._total_bytes -= self._files.pop(key)
+            return None
+        self._files.move_to_end(key)
+        return path
+    
+    def _serve(self, key: str) -> Optional[str]:
+        """Cached path or None, counted as a play (caller holds the lock)"""
+        path = self._cached_path(key)
+        if key in self._prefetched:
+            del self._prefetched[key]
+            if path is not None:
+                self.prefetch_hits += 1
+            else:
+                self.prefetch_late += 1
+        if path is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return path
+    
+    def lookup(self, text: str, language: str = 'en') -> Optional[str]:
+        """
+        Path of the clip for this text if it is ready; otherwise start
+        synthesizing it in the background and return None (never blocks)
+        """
+        if not self.available:
+            return None
+        key = self.make_key(text, language)
+        with self._lock:
+            path = self._serve(key)
+        if path is None:
+            self._submit(key, text, language)
+        return path
+    
+    def get(self, text: str, language: str = 'en', timeout: Optional[float] = None) -> Optional[str]:
+        """Path of the clip, waiting up to timeout seconds (None = indefinitely) for a cold one"""
+        if not self.available:
+            return None
+        key = self.make_key(text, language)
+        with self._lock:
+            path = self._serve(key)
+        if path is not None:
+            return path
+        try:
+            return self._submit(key, text, language).result(timeout)
+        except Exception:  # Timed out (still running) or synthesis failed
+            return None
+    
+    def prefetch(self, text: str, language: str = 'en') -> bool:
+        """
+        Queue a clip for background synthesis ahead of its first play
+        
+        Returns False if it is already cached or queued, or if max_prefetch
+        unplayed prefetches are outstanding.
+        """
+        if not self.available:
+            return False
+        key = self.make_key(text, language)
+        with self._lock:
+            if key in self._files or key in self._pending:
+                return False
+            cutoff = time.time() - self.PREFETCH_TTL
+            while self._prefetched and next(iter(self._prefetched.values())) < cutoff:
+                self._prefetched.popitem(last=False)
+            if len(self._prefetched) >= self.max_prefetch:
+                self.prefetch_skipped += 1
+                return False
+            self._prefetched[key] = time.time()
+            self.prefetched += 1
+        self._submit(key, text, language, prefetch=True)
+        return True
+    
+    def _submit(self, key: str, text: str, language: str, prefetch: bool = False) -> Future:
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None and not prefetch and key in self._queued_prefetches and future.cancel():
+                # Still waiting behind other prefetches: move it to the interactive pool
+                self._queued_prefetches.discard(key)
+                future = None
+            if future is None and key in self._files:  # Finished between the caller's miss and now
+                future = Future()
+                future.set_result(self.path_for(key))
+            elif future is None:
+                if prefetch:
+                    if self._prefetch_executor is None:
+                        self._prefetch_executor = ThreadPoolExecutor(max_workers=self.prefetch_workers,
+                                                                     thread_name_prefix="speech-prefetch")
+                    executor = self._prefetch_executor
+                else:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="speech")
+                    executor = self._executor
+                future = self._pending[key] = executor.submit(self._generate, key, text, language)
+                if prefetch:
+                    self._queued_prefetches.add(key)
+        return future
+    
+    def _generate(self, key: str, text: str, language: str) -> Optional[str]:
+        try:
+            audio = self.synthesizer.synthesize(speakable(text), resolve_language(language))
+            path = self.path_for(key)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[SpeechCache] Synthesis failed: {e}")
+            with self._lock:
+                self.errors += 1
+                self._pending.pop(key, None)
+                self._queued_prefetches.discard(key)
+            return None
+        
+        with self._lock:
+            self._total_bytes += len(audio) - self._files.get(key, 0)
+            self._files[key] = len(audio)
+            self._files.move_to_end(key)
+            self.generated += 1
+            self._pending.pop(key, None)
+            self._queued_prefetches.discard(key)
+            self._evict()
+        return path
+    
+    def _evict(self):
+        """Drop least recently used clips until under max_bytes, keeping the newest (caller holds the lock)"""
+        while self._total_bytes > self.max_bytes and len(self._files) > 1:
+            key, size = self._files.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            if self._prefetched.pop(key, None) is not None:
+                self.prefetch_evicted += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+    
+    def clear(self):
+        with self._lock:
+            for key in self._files:
+                try:
+                    os.remove(self.path_for(key))
+                except OSError:
+                    pass
+            self._files.clear()
+            self._total_bytes = 0
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            prefetch_plays = self.prefetch_hits + self.prefetch_late
+            return {
+                'available': self.available,
+                'clips': len(self._files),
+                'bytes': self._total_bytes,
+                'pending': len(self._pending),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'generated': self.generated,
+                'errors': self.errors,
+                'evictions': self.evictions,
+                'prefetched': self.prefetched,
+                'prefetch_hits': self.prefetch_hits,
+                'prefetch_late': self.prefetch_late,
+                'prefetch_skipped': self.prefetch_skipped,
+                'prefetch_evicted': self.prefetch_evicted,
+                'prefetch_hit_rate': round(self.prefetch_hits / prefetch_plays, 4) if prefetch_plays else 0.0
+            }
+    
+    def close(self):
+        """Wait for pending clips and stop the worker threads (they restart on next use)"""
+        with self._lock:
+            executors = (self._executor, self._prefetch_executor)
+            self._executor = self._prefetch_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+
+# Singleton instance
+_speech_instance = None
+
+def get_speech_cache() -> SpeechCache:
+    """Get or create the speech cache instance (clips under data/audio_cache)"""
+    global _speech_instance
+    if _speech_instance is None:
+        _speech_instance = SpeechCache()
+    return _speech_instance
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import base64
+    import random
+    
+    n_plays = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = 0.8
+    print(f"=== SPEECH CACHE BENCHMARK: {n_plays} plays, stub TTS {latency * 1e3:.0f}ms per clip ===")
+    
+    # Most plays are the opening alert every session hears; the rest are a handful of common replies
+    opening = ("Hello Arjun. Critical brake wear detected. Our diagnostics have detected critical brake pad wear "
+               "on your Tesla Model Y. It is unsafe to continue driving normally.")
+    replies = [f"Confirmed. I have booked your appointment for tomorrow at {h}:30 PM." for h in range(1, 9)]
+    rng = random.Random(3)
+    plays = [opening if rng.random() < 0.6 else rng.choice(replies) for _ in range(n_plays)]
+    
+    # Before: synthesize and base64-inline on every play, blocking the page
+    synthesizer = StubSynthesizer(latency=latency)
+    sample = min(n_plays, 10)
+    start = time.perf_counter()
+    for text in plays[:sample]:
+        base64.b64encode(synthesizer.synthesize(text, 'en')).decode()
+    inline_secs = (time.perf_counter() - start) / sample * n_plays
+    print(f"inline gTTS (est.) : UI blocked {inline_secs:7.2f}s total, {n_plays} syntheses")
+    
+    # After: the page only looks up a path; misses are synthesized in the background
+    synthesizer = StubSynthesizer(latency=latency)
+    cache = SpeechCache(cache_dir=tempfile.mkdtemp(), synthesizer=synthesizer)
+    start = time.perf_counter()
+    for text in plays:
+        cache.lookup(text, 'en')
+    ui_secs = time.perf_counter() - start
+    cache.close()
+    stats = cache.get_stats()
+    print(f"speech cache       : UI blocked {ui_secs:7.4f}s total, {synthesizer.calls} syntheses, "
+          f"hit rate {stats['hit_rate']:.1%} on the first pass")
+    
+    start = time.perf_counter()
+    ready = sum(cache.lookup(text, 'en') is not None for text in plays)
+    print(f"warm pass          : {ready}/{n_plays} clips ready, {(time.perf_counter() - start) / n_plays * 1e6:.0f}us per lookup")
+    
+    # Prefetch: alert clips are queued as soon as the alert is drafted; customers open the chat 1-6s later
+    n_alerts = 40
+    alerts = [f"CRITICAL ALERT for Owner {i}: brake pads critically worn on V-{i:04d}." for i in range(n_alerts)]
+    opens = sorted((rng.uniform(1.0, 6.0), text) for text in alerts)
+    for label, prefetch in [("synthesize on open", False), ("prefetch on alert", True)]:
+        cache = SpeechCache(cache_dir=tempfile.mkdtemp(), synthesizer=StubSynthesizer(latency=latency),
+                            prefetch_workers=8)
+        start = time.perf_counter()
+        if prefetch:
+            for text in alerts:
+                cache.prefetch(text, 'en')
+        ready = 0
+        for at, text in opens:
+            time.sleep(max(0.0, at - (time.perf_counter() - start)))
+            ready += cache.lookup(text, 'en') is not None
+        cache.close()
+        stats = cache.get_stats()
+        print(f"{label:<19}: {ready}/{n_alerts} alert clips ready when the chat opened "
+              f"(prefetch hit rate {stats['prefetch_hit_rate']:.1%}, {stats['prefetch_late']} late)")
@@ -0,0 +1,187 @@
+"""
+Conversation Summarizer
+Folds older chat turns into a short rolling summary of the facts worth keeping
+"""
+
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.alerts import ISSUE_BULLET
+from src.intents import get_intent_classifier
+from src.localization import ALERT_GREETINGS
+
+# Alert greetings identify the severity tier in any catalog language ("⚠️ CRITICAL ALERT for")
+_SEVERITY_MARKERS = sorted(
+    ((max(greeting.split("{owner_name}"), key=len).strip(" ,⚠️"), tier)
+     for greetings in ALERT_GREETINGS.values()
+     for tier, greeting in greetings.items() if tier != 'default'),
+    key=lambda marker: -len(marker[0])
+)
+_SEVERITY_FIELD = re.compile(r"\bseverity\W{0,3}(Critical|High|Medium|Low)\b", re.IGNORECASE)
+_DETECTED_ISSUE = re.compile(r"detected: (.+?)\.(?:\s|$)")
+_CLOCK_TIME = re.compile(r"\b\d{1,2}[:.]\d{2}\b")
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+_CANCELLATION = re.compile(r"\bcancel", re.IGNORECASE)
+
+# Intents worth remembering as topics (acknowledgements carry no information)
+SUMMARY_TOPICS = ('booking', 'cost', 'explain', 'urgency', 'decline')
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class FactSummarizer:
+    """
+    Deterministic, rule-based summarizer.
+
+    Rather than paraphrasing turns it extracts the facts the agent needs
+    later: the severity tier and issue list from the alert, the appointment
+    slot the agent confirmed (a sentence with a clock time, in reply to or
+    about a booking; cleared if the customer cancels), and which topics the
+    customer has raised. Facts from newer turns replace older ones, and
+    every field is capped, so the rendered summary stays a few hundred
+    characters however long the conversation runs. It makes no LLM call.
+    """
+    
+    MAX_ISSUES = 5
+    MAX_FIELD_CHARS = 160
+    
+    def summarize(self, facts: Optional[Dict], messages: List[Dict[str, str]]) -> Dict:
+        """New facts after folding messages (oldest first) into the previous facts"""
+        facts = dict(facts or {})
+        topics = list(facts.get('topics', []))
+        turns = facts.get('turns', 0)
+        classify = get_intent_classifier().classify
+        last_user_intent = None
+        
+        for message in messages:
+            content = message.get('content') or ""
+            if message.get('role') == 'user':
+                turns += 1
+                last_user_intent = classify(content)
+                if last_user_intent in SUMMARY_TOPICS and last_user_intent not in topics:
+                    topics.append(last_user_intent)
+                if _CANCELLATION.search(content) and facts.get('booked_slot'):
+                    facts['booked_slot'] = None
+                continue
+            
+            severity = self._severity(content)
+            if severity:
+                facts['severity'] = severity
+            issues = self._issues(content)
+            if issues:
+                facts['issues'] = issues
+            slot = self._booked_slot(content, last_user_intent, classify)
+            if slot:
+                facts['booked_slot'] = slot
+        
+        facts['topics'] = topics
+        facts['turns'] = turns
+        return facts
+    
+    def _severity(self, content: str) -> Optional[str]:
+        for marker, tier in _SEVERITY_MARKERS:
+            if marker and marker in content:
+                return tier
+        match = _SEVERITY_FIELD.search(content)
+        return match.group(1).capitalize() if match else None
+    
+    def _issues(self, content: str) -> List[str]:
+        issues = [line.strip()[len(ISSUE_BULLET):].strip() for line in content.splitlines()
+                  if line.strip().startswith(ISSUE_BULLET)]
+        if not issues:
+            issues = _DETECTED_ISSUE.findall(content)
+        return [_clip(issue, self.MAX_FIELD_CHARS) for issue in issues[:self.MAX_ISSUES]]
+    
+    def _booked_slot(self, content: str, last_user_intent: Optional[str], classify) -> Optional[str]:
+        if not _CLOCK_TIME.search(content):
+            return None
+        for sentence in _SENTENCE_END.split(content):
+            if _CLOCK_TIME.search(sentence) and (last_user_intent == 'booking' or classify(sentence) == 'booking'):
+                return _clip(sentence.strip(), self.MAX_FIELD_CHARS)
+        return None
+    
+    def render(self, facts: Optional[Dict]) -> Optional[str]:
+        """One line per known fact, or None when nothing has been folded yet"""
+        if not facts or not facts.get('turns'):
+            return None
+        lines = [f"- {facts['turns']} earlier customer message(s) summarized"]
+        if facts.get('severity'):
+            lines.append(f"- Severity: {facts['severity']}")
+        if facts.get('issues'):
+            lines.append(f"- Issues: {'; '.join(facts['issues'])}")
+        if facts.get('booked_slot'):
+            lines.append(f"- Booked slot: {facts['booked_slot']}")
+        if facts.get('topics'):
+            lines.append(f"- Customer asked about: {', '.join(facts['topics'])}")
+        return "\n".join(lines)
+
+
+# Singleton instance
+_summarizer_instance = None
+
+def get_summarizer() -> FactSummarizer:
+    """Get or create the summarizer instance"""
+    global _summarizer_instance
+    if _summarizer_instance is None:
+        _summarizer_instance = FactSummarizer()
+    return _summarizer_instance
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import time
+    
+    from src.chatbot import CustomerServiceBot, StubChatClient
+    from src.conversations import ConversationManager
+    from src.response_cache import ResponseCache
+    
+    class PromptRecordingClient(StubChatClient):
+        """Stub client that remembers the size and text of every prompt it receives"""
+        
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.prompt_chars: List[int] = []
+            self.last_prompt = ""
+        
+        def _create(self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs):
+            self.last_prompt = "\n".join(m["content"] for m in messages)
+            self.prompt_chars.append(len(self.last_prompt))
+            return super()._create(model, messages, stream=stream, **kwargs)
+    
+    n_turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    context = {'vehicle_id': 'V-005', 'diagnosis_report': {'status': 'Critical', 'issues': ['Brake pads worn (2.1mm)'],
+                                                           'recommendation': 'Book a brake service'}}
+    questions = ["Is it safe to drive to work?", "What does brake wear mean?", "How much will it cost?",
+                 "Can I wait until next month?", "Do you have loaner cars?", "Will the warranty cover it?"]
+    reply = ("Thanks for asking. Brake pads at this thickness lose stopping power quickly, especially in rain, "
+             "so our technicians treat it as a priority repair. Let me know if you have more questions.")
+    print(f"=== CONVERSATION COMPACTION BENCHMARK: {n_turns} customer turns ===")
+    
+    # Full history keeps every fact but grows without bound; the last 10 raw messages are bounded but forget
+    runs = [("full history", ConversationManager(persist=False, history_limit=2 * n_turns + 3, compact_at=None), None),
+            ("last 10 raw", ConversationManager(persist=False, compact_at=None), 10),
+            ("compacted", ConversationManager(persist=False), 10)]
+    for label, manager, window in runs:
+        client = PromptRecordingClient(reply=reply)
+        bot = CustomerServiceBot(conversations=manager, client=client, cache=ResponseCache(max_entries=0))
+        bot.LLM_CONTEXT_MESSAGES = window
+        alert = bot.generate_initial_alert(context['diagnosis_report'], 'V-005', 'Ravi')
+        manager.append("s1", "V-005", "assistant", alert)
+        manager.append("s1", "V-005", "user", "Please book me in")
+        manager.append("s1", "V-005", "assistant", "Done: I've scheduled your brake service for Friday at 09:30 AM.")
+        
+        start = time.perf_counter()
+        for i in range(n_turns):
+            bot.chat(questions[i % len(questions)], context, session_id="s1")
+        elapsed = time.perf_counter() - start
+        
+        chars = client.prompt_chars
+        print(f"{label:<12}: prompt avg {sum(chars) / len(chars):6.0f} chars (~{sum(chars) / len(chars) / 4:4.0f} tokens), "
+              f"max {max(chars):5d}; booked slot in final prompt: {'09:30' in client.last_prompt}; "
+              f"{elapsed / n_turns * 1e3:.2f}ms/turn overhead")
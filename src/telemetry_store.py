@@ -0,0 +1,798 @@
+"""
+Telemetry History Store
+Append-only, day-partitioned columnar storage for vehicle telemetry
+"""
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Sequence, Iterator, Tuple
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TELEMETRY_DIR = os.path.join(BASE_DIR, 'data', 'telemetry')
+
+# Numeric telematics fields recorded by the fleet (see data/vehicles.json)
+DEFAULT_SIGNALS = (
+    'odometer_km', 'speed_kmh', 'engine_rpm', 'engine_load_pct', 'coolant_temp_c',
+    'battery_voltage_v', 'fuel_level_pct', 'active_dtc_count',
+    'brake_pad_thickness_mm', 'tire_pressure_psi'
+)
+
+MICROS_PER_SECOND = 1_000_000
+MICROS_PER_DAY = 86400 * MICROS_PER_SECOND
+
+# Rollup tiers, finest first: (name, bucket width in microseconds)
+ROLLUP_TIERS = (
+    ('1m', 60 * MICROS_PER_SECOND),
+    ('1h', 3600 * MICROS_PER_SECOND),
+    ('1d', MICROS_PER_DAY),
+)
+ROLLUP_WIDTHS = dict(ROLLUP_TIERS)
+
+# Layout of the last axis of a rollup stats array
+STAT_MIN, STAT_MAX, STAT_SUM, STAT_COUNT, STAT_LAST = range(5)
+
+
+def to_epoch_micros(timestamps) -> np.ndarray:
+    """Accept datetimes, ISO strings, datetime64 or epoch microseconds"""
+    values = np.asarray(timestamps)
+    if values.dtype.kind in 'fiu':
+        return values.astype(np.int64)
+    if values.dtype.kind != 'M':
+        values = np.array([
+            np.datetime64(t.isoformat() if isinstance(t, datetime) else t, 'us') for t in values.ravel()
+        ], dtype='datetime64[us]')
+    return values.astype('datetime64[us]').astype(np.int64)
+
+
+def compute_rollup(codes: np.ndarray, times: np.ndarray, values: np.ndarray,
+                   width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate raw rows into (vehicle, bucket) rollups
+
+    Rows must be sorted by (vehicle code, time) and values is (signals, rows).
+    Returns keys (buckets, 2) as [code, bucket start] and stats (signals, buckets, 5)
+    indexed by STAT_*. NaN readings are excluded; LAST is the latest non-NaN reading.
+    """
+    if len(times) == 0:
+        return np.zeros((0, 2), dtype=np.int64), np.zeros((len(values), 0, 5))
+    
+    buckets = times // width * width
+    starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])])
+    keys = np.column_stack([codes[starts], buckets[starts]]).astype(np.int64)
+    return keys, _reduce_stats(values, None, starts)
+
+
+def compute_rollup_tiers(codes: np.ndarray, times: np.ndarray,
+                         values: np.ndarray) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Every tier in ROLLUP_TIERS for rows sorted by (vehicle code, time)
+    
+    Only the finest tier reads raw rows; each coarser tier re-aggregates the
+    one below it, which is exact because every bucket width divides the next.
+    """
+    tiers = {}
+    keys = stats = None
+    for tier, width in ROLLUP_TIERS:
+        if keys is None:
+            keys, stats = compute_rollup(codes, times, values, width)
+        elif len(keys):
+            buckets = keys[:, 1] // width * width
+            starts = np.flatnonzero(np.r_[True, (keys[1:, 0] != keys[:-1, 0]) | (buckets[1:] != buckets[:-1])])
+            keys = np.column_stack([keys[starts, 0], buckets[starts]])
+            stats = _reduce_stats(None, stats, starts)
+        tiers[tier] = (keys, stats)
+    return tiers
+
+
+def _reduce_stats(values: Optional[np.ndarray], stats: Optional[np.ndarray], starts: np.ndarray) -> np.ndarray:
+    """
+    Reduce contiguous row groups beginning at `starts`
+
+    With stats=None, values holds raw readings (signals, rows); otherwise stats
+    holds partial rollups (signals, rows, 5) being merged, oldest row first.
+    """
+    if stats is None:
+        valid = ~np.isnan(values)
+        mins = maxs = lasts = values
+        sums = np.where(valid, values, 0.0)
+        counts = valid.astype(np.float64)
+    else:
+        mins, maxs, sums, counts, lasts = (stats[:, :, i] for i in range(5))
+        valid = ~np.isnan(lasts)
+    
+    out = np.empty((len(mins), len(starts), 5))
+    if len(starts) == valid.shape[1]:
+        # Every group is a single row - nothing to reduce
+        for stat, column in ((STAT_MIN, mins), (STAT_MAX, maxs), (STAT_SUM, sums),
+                             (STAT_COUNT, counts), (STAT_LAST, lasts)):
+            out[:, :, stat] = column
+        return out
+    
+    out[:, :, STAT_MIN] = np.fmin.reduceat(mins, starts, axis=1)
+    out[:, :, STAT_MAX] = np.fmax.reduceat(maxs, starts, axis=1)
+    out[:, :, STAT_SUM] = np.add.reduceat(sums, starts, axis=1)
+    out[:, :, STAT_COUNT] = np.add.reduceat(counts, starts, axis=1)
+    
+    # Latest non-NaN row of each group
+    row_index = np.where(valid, np.arange(valid.shape[1]), -1)
+    last_row = np.maximum.reduceat(row_index, starts, axis=1)
+    picked = np.take_along_axis(lasts, np.maximum(last_row, 0), axis=1)
+    out[:, :, STAT_LAST] = np.where(last_row >= 0, picked, np.nan)
+    return out
+
+
+def merge_rollups(keys: np.ndarray, stats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combine rollup rows that share a (vehicle, bucket) key
+
+    Input rows must be in ingestion order (chunk order) so LAST resolves to the
+    newest reading; output is sorted by (vehicle, bucket).
+    """
+    if len(keys) == 0:
+        return keys, stats
+    if np.all((keys[1:, 0] > keys[:-1, 0]) | ((keys[1:, 0] == keys[:-1, 0]) & (keys[1:, 1] > keys[:-1, 1]))):
+        return keys, stats
+    order = np.lexsort((keys[:, 1], keys[:, 0]))
+    keys, stats = keys[order], stats[:, order]
+    starts = np.flatnonzero(np.r_[True, np.any(keys[1:] != keys[:-1], axis=1)])
+    if len(starts) == len(keys):
+        return keys, stats
+    return keys[starts], _reduce_stats(None, stats, starts)
+
+
+def pick_tier(resolution_us: float) -> str:
+    """Coarsest rollup tier whose buckets are no wider than the requested resolution ('raw' if none)"""
+    best = 'raw'
+    for name, width in ROLLUP_TIERS:
+        if width <= resolution_us:
+            best = name
+    return best
+
+
+class TelemetryChunk:
+    """
+    One flushed batch of rows inside a day partition.
+
+    Rows are sorted by (vehicle code, time) and `offsets` marks where each
+    vehicle's run starts, so one vehicle's history inside a chunk is a
+    contiguous slice of every column. Columns are opened with mmap_mode='r',
+    which makes those slices views onto the page cache rather than copies.
+    """
+    
+    def __init__(self, path: str, meta: Dict):
+        self.path = path
+        self.t_min = meta['t_min']
+        self.t_max = meta['t_max']
+        self.rows = meta['rows']
+        self._columns: Dict[str, np.ndarray] = {}
+        self._runs: Optional[Dict[int, Tuple[int, int]]] = None
+        self._rollups: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def column(self, name: str) -> np.ndarray:
+        array = self._columns.get(name)
+        if array is None:
+            array = self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+        return array
+    
+    def runs(self) -> Dict[int, Tuple[int, int]]:
+        """vehicle code -> (start, stop) row range"""
+        if self._runs is None:
+            codes = self.column('vehicles')
+            offsets = self.column('offsets')
+            self._runs = {int(c): (int(offsets[i]), int(offsets[i + 1])) for i, c in enumerate(codes)}
+        return self._runs
+    
+    def window(self, code: int, start_us: int, end_us: int) -> Optional[Tuple[int, int]]:
+        """Row range of one vehicle's samples with start_us <= t < end_us"""
+        run = self.runs().get(code)
+        if run is None:
+            return None
+        lo, hi = run
+        times = self.column('time')[lo:hi]
+        a = lo + int(np.searchsorted(times, start_us, side='left'))
+        b = lo + int(np.searchsorted(times, end_us, side='left'))
+        return (a, b) if b > a else None
+    
+    def rollup(self, tier: str, signal: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pre-aggregated (keys, stats) of one signal for one tier, sorted by (vehicle, bucket)
+        
+        Rollups are written with the chunk at flush time, one file per signal.
+        Chunks written before rollups existed are aggregated from their raw
+        columns on first use.
+        """
+        cached = self._rollups.get((tier, signal))
+        if cached is None:
+            if os.path.exists(os.path.join(self.path, f"rollup_{tier}_keys.npy")):
+                cached = (self.column(f"rollup_{tier}_keys"), self.column(f"rollup_{tier}_{signal}"))
+            else:
+                offsets = self.column('offsets')
+                codes = np.repeat(self.column('vehicles'), np.diff(offsets))
+                values = np.asarray(self.column(signal), dtype=np.float64)[None, :]
+                keys, stats = compute_rollup(codes, self.column('time'), values, ROLLUP_WIDTHS[tier])
+                cached = (keys, stats[0])
+            self._rollups[(tier, signal)] = cached
+        return cached
+    
+    def last_times(self) -> Dict[int, int]:
+        """Latest timestamp per vehicle in this chunk"""
+        times = self.column('time')
+        return {code: int(times[stop - 1]) for code, (_, stop) in self.runs().items()}
+
+
+class TelemetryStore:
+    """
+    Columnar telemetry history, one .npy file per signal.
+
+    Layout under `root`:
+        vehicles.json                 vehicle_id list; a vehicle's code is its index
+        manifest.json                 chunk list with row counts and time bounds
+        <YYYY-MM-DD>/chunk-<n>/       time.npy, vehicles.npy, offsets.npy, <signal>.npy
+
+    Appends go to an in-memory buffer. flush() splits the buffer by UTC day and
+    writes one new immutable chunk per day touched, so existing files are
+    never rewritten. Chunks are written under a temporary name and renamed
+    into place before the manifest is replaced, so a crash mid-flush leaves at
+    most an orphan directory that the manifest does not reference.
+
+    Samples not newer than the latest one already stored for a vehicle are
+    dropped, so re-appending the same vehicles.json snapshot is harmless.
+    """
+    
+    FLUSH_EVERY = 100_000  # Buffered rows before an automatic flush
+    
+    def __init__(self, root: str = TELEMETRY_DIR, signals: Sequence[str] = DEFAULT_SIGNALS):
+        self.root = root
+        self.signals = list(signals)
+        self.vehicle_ids: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self.chunks: List[TelemetryChunk] = []
+        self.last_time: Dict[int, int] = {}
+        
+        self._next_chunk = 0
+        self._lock = threading.Lock()
+        self._reset_buffer()
+        self._load()
+    
+    def _reset_buffer(self):
+        self._buf_codes: List[np.ndarray] = []
+        self._buf_times: List[np.ndarray] = []
+        self._buf_values: Dict[str, List[np.ndarray]] = {signal: [] for signal in self.signals}
+        self._buffered = 0
+    
+    def _load(self):
+        """Read the vehicle dictionary and manifest, if the store already exists"""
+        vehicles_path = os.path.join(self.root, 'vehicles.json')
+        if os.path.exists(vehicles_path):
+            with open(vehicles_path, 'r') as f:
+                self.vehicle_ids = json.load(f)
+            self.codes = {vehicle_id: i for i, vehicle_id in enumerate(self.vehicle_ids)}
+        
+        manifest_path = os.path.join(self.root, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        
+        self._next_chunk = manifest.get('next_chunk', 0)
+        for meta in manifest.get('chunks', []):
+            chunk = TelemetryChunk(os.path.join(self.root, meta['path']), meta)
+            self.chunks.append(chunk)
+            for code, t in chunk.last_times().items():
+                if t > self.last_time.get(code, -1):
+                    self.last_time[code] = t
+    
+    def _write_json(self, name: str, payload):
+        path = os.path.join(self.root, name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    
+    def _code_for(self, vehicle_id: str) -> int:
+        code = self.codes.get(vehicle_id)
+        if code is None:
+            code = self.codes[vehicle_id] = len(self.vehicle_ids)
+            self.vehicle_ids.append(vehicle_id)
+        return code
+    
+    # --- Ingestion ---
+    
+    def append_batch(self, vehicle_ids: Sequence[str], timestamps, values: Dict[str, Sequence[float]]) -> int:
+        """
+        Buffer a batch of samples; returns the number of rows accepted
+
+        values maps signal name -> one reading per sample (missing signals are NaN).
+        """
+        if len(vehicle_ids) == 0:
+            return 0
+        
+        times = to_epoch_micros(timestamps)
+        with self._lock:
+            codes = np.fromiter((self._code_for(v) for v in vehicle_ids), dtype=np.int32, count=len(vehicle_ids))
+            
+            # Keep only samples newer than what is stored for the vehicle (and first of any in-batch duplicate)
+            order = np.lexsort((times, codes))
+            codes_sorted, times_sorted = codes[order], times[order]
+            unique_codes, inverse = np.unique(codes_sorted, return_inverse=True)
+            last = np.array([self.last_time.get(int(c), -1) for c in unique_codes], dtype=np.int64)
+            last_per_row = last[inverse]
+            fresh = times_sorted > last_per_row
+            fresh[1:] &= (codes_sorted[1:] != codes_sorted[:-1]) | (times_sorted[1:] != times_sorted[:-1])
+            if not fresh.any():
+                return 0
+            
+            keep = order[fresh]
+            self._buf_codes.append(codes[keep])
+            self._buf_times.append(times[keep])
+            for signal in self.signals:
+                column = values.get(signal)
+                if column is None:
+                    self._buf_values[signal].append(np.full(len(keep), np.nan, dtype=np.float32))
+                else:
+                    self._buf_values[signal].append(np.asarray(column, dtype=np.float32)[keep])
+            
+            # Rows of one vehicle are sorted, so the last kept row is its newest
+            kept_codes = codes[keep]
+            ends = np.flatnonzero(np.append(kept_codes[1:] != kept_codes[:-1], True))
+            for code, t in zip(kept_codes[ends], times[keep][ends]):
+                self.last_time[int(code)] = int(t)
+            
+            self._buffered += len(keep)
+            accepted = len(keep)
+        
+        if self._buffered >= self.FLUSH_EVERY:
+            self.flush()
+        return accepted
+    
+    def append(self, vehicle_id: str, timestamp, telematics: Dict) -> bool:
+        """Buffer a single telemetry snapshot"""
+        return self.append_batch(
+            [vehicle_id], [timestamp],
+            {signal: [telematics.get(signal, np.nan)] for signal in self.signals}
+        ) == 1
+    
+    def ingest_vehicles(self, vehicles: List[Dict]) -> int:
+        """
+        Buffer the current telemetry of a fleet listing
+
+        Accepts raw vehicles.json records (timestamp under metadata) or the
+        dashboard's flattened records (timestamp under 'telemetry_timestamp').
+        """
+        ids, timestamps = [], []
+        values = {signal: [] for signal in self.signals}
+        
+        for vehicle in vehicles:
+            timestamp = vehicle.get('telemetry_timestamp') or vehicle.get('metadata', {}).get('timestamp')
+            telematics = vehicle.get('telematics')
+            if not timestamp or not telematics:
+                continue
+            ids.append(vehicle['vehicle_id'])
+            timestamps.append(timestamp)
+            for signal in self.signals:
+                values[signal].append(telematics.get(signal, np.nan))
+        
+        return self.append_batch(ids, timestamps, values)
+    
+    def flush(self) -> int:
+        """Write buffered rows as new chunks, one per UTC day; returns rows written"""
+        with self._lock:
+            if not self._buffered:
+                return 0
+            codes = np.concatenate(self._buf_codes)
+            times = np.concatenate(self._buf_times)
+            values = {signal: np.concatenate(parts) for signal, parts in self._buf_values.items()}
+            self._reset_buffer()
+            
+            os.makedirs(self.root, exist_ok=True)
+            days = times // MICROS_PER_DAY
+            order = np.lexsort((times, codes, days))
+            codes, times, days = codes[order], times[order], days[order]
+            values = {signal: column[order] for signal, column in values.items()}
+            
+            bounds = np.flatnonzero(np.diff(days)) + 1
+            new_chunks = []
+            for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(days)]):
+                day = str(np.datetime64(int(days[lo]), 'D'))
+                rel_path = os.path.join(day, f"chunk-{self._next_chunk:06d}")
+                self._next_chunk += 1
+                
+                chunk_codes = codes[lo:hi]
+                starts = np.flatnonzero(np.r_[True, chunk_codes[1:] != chunk_codes[:-1]])
+                columns = {
+                    'time': times[lo:hi],
+                    'vehicles': chunk_codes[starts],
+                    'offsets': np.r_[starts, hi - lo].astype(np.int64),
+                }
+                columns.update({signal: column[lo:hi] for signal, column in values.items()})
+                
+                # Rollups are computed once here so chart queries never touch raw rows
+                matrix = np.stack([values[signal][lo:hi] for signal in self.signals]).astype(np.float64)
+                for tier, (keys, stats) in compute_rollup_tiers(chunk_codes, times[lo:hi], matrix).items():
+                    columns[f"rollup_{tier}_keys"] = keys
+                    for i, signal in enumerate(self.signals):
+                        columns[f"rollup_{tier}_{signal}"] = stats[i]
+                
+                final_path = os.path.join(self.root, rel_path)
+                tmp_path = final_path + '.tmp'
+                os.makedirs(tmp_path, exist_ok=True)
+                for name, array in columns.items():
+                    np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+                os.replace(tmp_path, final_path)
+                
+                meta = {'path': rel_path, 'rows': int(hi - lo),
+                        't_min': int(times[lo:hi].min()), 't_max': int(times[lo:hi].max())}
+                new_chunks.append(TelemetryChunk(final_path, meta))
+            
+            # Vehicle dictionary first: a manifest must never reference an unknown code
+            self._write_json('vehicles.json', self.vehicle_ids)
+            self.chunks.extend(new_chunks)
+            self._write_json('manifest.json', {
+                'signals': self.signals,
+                'next_chunk': self._next_chunk,
+                'chunks': [{'path': os.path.relpath(c.path, self.root), 'rows': c.rows,
+                            't_min': c.t_min, 't_max': c.t_max} for c in self.chunks]
+            })
+            return len(times)
+    
+    # --- Queries ---
+    
+    def _bounds(self, start, end) -> Tuple[int, int]:
+        start_us = int(to_epoch_micros([start])[0]) if start is not None else np.iinfo(np.int64).min
+        end_us = int(to_epoch_micros([end])[0]) if end is not None else np.iinfo(np.int64).max
+        return start_us, end_us
+    
+    def _chunks_between(self, start_us: int, end_us: int) -> List[TelemetryChunk]:
+        """Partition pruning on the manifest's time bounds"""
+        return [c for c in self.chunks if c.t_max >= start_us and c.t_min < end_us]
+    
+    def iter_slices(self, vehicle_id: str, start=None, end=None,
+                    signals: Optional[Sequence[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Yield one vehicle's samples in [start, end), one dict of columns per chunk
+
+        The arrays are read-only views into the memory-mapped chunk files.
+        Only flushed rows are visible.
+        """
+        code = self.codes.get(vehicle_id)
+        if code is None:
+            return
+        start_us, end_us = self._bounds(start, end)
+        signals = self.signals if signals is None else signals
+        
+        for chunk in self._chunks_between(start_us, end_us):
+            rows = chunk.window(code, start_us, end_us)
+            if rows is None:
+                continue
+            a, b = rows
+            out = {'time': chunk.column('time')[a:b]}
+            out.update({signal: chunk.column(signal)[a:b] for signal in signals})
+            yield out
+    
+    def query(self, vehicle_id: str, start=None, end=None,
+              signals: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        One vehicle's samples in [start, end) as time-ordered columns
+
+        A window inside a single chunk is returned zero-copy; windows spanning
+        several chunks are concatenated.
+        """
+        signals = self.signals if signals is None else signals
+        slices = list(self.iter_slices(vehicle_id, start, end, signals))
+        if len(slices) == 1:
+            return slices[0]
+        if not slices:
+            empty = {'time': np.zeros(0, dtype=np.int64)}
+            empty.update({signal: np.zeros(0, dtype=np.float32) for signal in signals})
+            return empty
+        return {name: np.concatenate([s[name] for s in slices]) for name in slices[0]}
+    
+    def fleet_window(self, start=None, end=None,
+                     signals: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Every vehicle's samples in [start, end) as flat columns
+
+        Adds a 'vehicle' column of codes (index into self.vehicle_ids). Rows are
+        grouped by chunk, then by vehicle and time within a chunk.
+        """
+        start_us, end_us = self._bounds(start, end)
+        signals = self.signals if signals is None else signals
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in ['vehicle', 'time'] + list(signals)}
+        
+        for chunk in self._chunks_between(start_us, end_us):
+            times = chunk.column('time')
+            mask = (times >= start_us) & (times < end_us)
+            if not mask.any():
+                continue
+            offsets = chunk.column('offsets')
+            codes = np.repeat(chunk.column('vehicles'), np.diff(offsets))
+            parts['vehicle'].append(codes[mask])
+            parts['time'].append(times[mask])
+            for signal in signals:
+                parts[signal].append(chunk.column(signal)[mask])
+        
+        dtypes = {'vehicle': np.int32, 'time': np.int64}
+        return {
+            name: np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtypes.get(name, np.float32))
+            for name, arrays in parts.items()
+        }
+    
+    def replay_into(self, model, start=None, end=None):
+        """Feed stored history into a model exposing ingest(vehicle_ids, timestamps, values)"""
+        window = self.fleet_window(start, end, getattr(model, 'signals', self.signals))
+        if len(window['time']) == 0:
+            return
+        ids = np.asarray(self.vehicle_ids, dtype=object)[window['vehicle']]
+        values = {name: column for name, column in window.items() if name not in ('vehicle', 'time')}
+        model.ingest(ids, window['time'].astype('datetime64[us]'), values)
+    
+    def latest_time(self) -> Optional[int]:
+        """Newest flushed timestamp (epoch microseconds), or None when empty"""
+        return max((c.t_max for c in self.chunks), default=None)
+    
+    def rollups(self, tier: str, start=None, end=None, vehicle_id: Optional[str] = None,
+                signals: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Rollup buckets of one tier overlapping [start, end)
+        
+        Returns {'vehicle': codes, 'bucket': bucket starts (epoch us), 'rows_read': n,
+        <signal>: {'min', 'max', 'mean', 'last', 'count'}}, sorted by (vehicle, bucket).
+        Buckets split across flushes are merged.
+        """
+        width = ROLLUP_WIDTHS[tier]
+        start_us, end_us = self._bounds(start, end)
+        if start_us > np.iinfo(np.int64).min:
+            start_us = start_us // width * width
+        signals = self.signals if signals is None else list(signals)
+        
+        code = None
+        if vehicle_id is not None:
+            code = self.codes.get(vehicle_id)
+            if code is None:
+                return {'vehicle': np.zeros(0, dtype=np.int64), 'bucket': np.zeros(0, dtype=np.int64),
+                        'rows_read': 0, **{signal: {} for signal in signals}}
+        
+        key_parts, stat_parts = [], []
+        for chunk in self._chunks_between(start_us, end_us):
+            keys = chunk.rollup(tier, signals[0])[0] if signals else np.zeros((0, 2), dtype=np.int64)
+            a, b = 0, len(keys)
+            if code is not None:
+                a = int(np.searchsorted(keys[:, 0], code, side='left'))
+                b = int(np.searchsorted(keys[:, 0], code, side='right'))
+            keys = keys[a:b]
+            mask = (keys[:, 1] >= start_us) & (keys[:, 1] < end_us)
+            key_parts.append(keys[mask])
+            stat_parts.append(np.stack([chunk.rollup(tier, signal)[1][a:b][mask] for signal in signals]))
+        
+        if key_parts:
+            keys, stats = np.concatenate(key_parts), np.concatenate(stat_parts, axis=1)
+        else:
+            keys, stats = np.zeros((0, 2), dtype=np.int64), np.zeros((len(signals), 0, 5))
+        rows_read = len(keys)
+        keys, stats = merge_rollups(keys, stats)
+        
+        result = {'vehicle': keys[:, 0], 'bucket': keys[:, 1], 'rows_read': rows_read}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i, signal in enumerate(signals):
+                result[signal] = {
+                    'min': stats[i, :, STAT_MIN],
+                    'max': stats[i, :, STAT_MAX],
+                    'mean': stats[i, :, STAT_SUM] / stats[i, :, STAT_COUNT],
+                    'last': stats[i, :, STAT_LAST],
+                    'count': stats[i, :, STAT_COUNT].astype(np.int64),
+                }
+        return result
+    
+    def _rollup_parts(self, tier: str, signal: str, start_us: int, end_us: int,
+                      vehicle_id: Optional[str] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Yield each chunk's (keys, stats) rollup rows of one signal with bucket starts in [start, end)
+        
+        Rows are left unmerged, so a bucket split across flushes appears once per
+        chunk. Chunks lying wholly inside the window are yielded without a mask.
+        """
+        code = None
+        if vehicle_id is not None:
+            code = self.codes.get(vehicle_id)
+            if code is None:
+                return
+        for chunk in self._chunks_between(start_us, end_us):
+            keys, stats = chunk.rollup(tier, signal)
+            if code is not None:
+                a = int(np.searchsorted(keys[:, 0], code, side='left'))
+                b = int(np.searchsorted(keys[:, 0], code, side='right'))
+                keys, stats = keys[a:b], stats[a:b]
+            if chunk.t_min < start_us or chunk.t_max >= end_us:
+                mask = (keys[:, 1] >= start_us) & (keys[:, 1] < end_us)
+                keys, stats = keys[mask], stats[mask]
+            if len(keys):
+                yield keys, stats
+    
+    def series(self, signal: str, start, end, points: int = 60,
+               vehicle_id: Optional[str] = None, stat: str = 'mean') -> Dict:
+        """
+        A chart-ready series of `points` evenly spaced slots over [start, end)
+        
+        Reads the coarsest rollup tier whose buckets fit inside one slot, so a
+        fleet-wide 30-day chart scans daily buckets rather than raw samples.
+        Without vehicle_id the fleet is aggregated; stat is 'mean', 'min' or 'max'.
+        Empty slots carry the previous value forward (NaN before the first sample).
+        
+        Returns {'time': slot starts (epoch us), 'value', 'tier', 'rows_read'}.
+        """
+        if stat not in ('mean', 'min', 'max'):
+            raise ValueError(f"Unsupported stat: {stat}")
+        start_us, end_us = self._bounds(start, end)
+        slot = max((end_us - start_us) / points, 1.0)
+        tier = pick_tier(slot)
+        
+        # (slots, sums, counts) per part for 'mean', (slots, extremes) for 'min' / 'max'
+        parts = []
+        if tier == 'raw':
+            if vehicle_id is None:
+                raw = self.fleet_window(start_us, end_us, [signal])
+            else:
+                raw = self.query(vehicle_id, start_us, end_us, [signal])
+            values = raw[signal].astype(np.float64)
+            slots = np.clip(((raw['time'] - start_us) // slot).astype(np.int64), 0, points - 1)
+            if stat == 'mean':
+                valid = ~np.isnan(values)
+                parts.append((slots, np.where(valid, values, 0.0), valid.astype(np.float64)))
+            else:
+                parts.append((slots, values))
+            rows_read = len(values)
+        else:
+            # Bucket starts lie on the tier's grid: place each grid cell in its slot once
+            # and index by cell, instead of a float division per bucket row
+            width = ROLLUP_WIDTHS[tier]
+            first = start_us // width * width
+            cells = np.arange(first, end_us, width, dtype=np.int64)
+            cell_slots = np.clip(((cells - start_us) // slot).astype(np.int64), 0, points - 1)
+            fields = {'mean': (STAT_SUM, STAT_COUNT), 'min': (STAT_MIN,), 'max': (STAT_MAX,)}[stat]
+            
+            # Sum, count, min and max combine in any order, so every chunk's buckets go
+            # straight into their slots without merging rows that share a (vehicle, bucket)
+            rows_read = 0
+            for keys, stats in self._rollup_parts(tier, signal, first, end_us, vehicle_id):
+                parts.append((cell_slots[(keys[:, 1] - first) // width],) + tuple(stats[:, f] for f in fields))
+                rows_read += len(keys)
+        
+        if stat == 'mean':
+            sums, counts = np.zeros(points), np.zeros(points)
+            for slots, part_sums, part_counts in parts:
+                sums += np.bincount(slots, part_sums, points)
+                counts += np.bincount(slots, part_counts, points)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                value = sums / counts
+        else:
+            value = np.full(points, np.nan)
+            for slots, extremes in parts:
+                (np.fmin if stat == 'min' else np.fmax).at(value, slots, extremes)
+        
+        # Carry the last observed value across empty slots
+        filled = np.where(~np.isnan(value), np.arange(points), -1)
+        np.maximum.accumulate(filled, out=filled)
+        value = np.where(filled >= 0, value[np.maximum(filled, 0)], np.nan)
+        
+        return {
+            'time': (start_us + np.arange(points) * slot).astype(np.int64),
+            'value': value,
+            'tier': tier,
+            'rows_read': rows_read
+        }
+    
+    def row_count(self) -> int:
+        return sum(c.rows for c in self.chunks) + self._buffered
+    
+    def clear(self):
+        """Delete all stored history"""
+        with self._lock:
+            if os.path.isdir(self.root):
+                shutil.rmtree(self.root)
+            self.vehicle_ids, self.codes, self.chunks, self.last_time = [], {}, [], {}
+            self._next_chunk = 0
+            self._reset_buffer()
+
+
+# Singleton instance
+_store_instance = None
+
+def get_telemetry_store() -> TelemetryStore:
+    """Get or create the telemetry store instance"""
+    global _store_instance
+    if _store_instance is None:
+        _store_instance = TelemetryStore()
+    return _store_instance
+
+
+# --- BENCHMARK RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+    
+    n_vehicles = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    samples_per_day = 96  # One reading every 15 minutes
+    print(f"=== TELEMETRY STORE BENCHMARK: {n_vehicles:,} vehicles x {n_days} days x {samples_per_day}/day ===")
+    
+    rng = np.random.default_rng(11)
+    ids = np.array([f"V-{i:06d}" for i in range(n_vehicles)], dtype=object)
+    origin = to_epoch_micros(['2025-11-01T00:00:00'])[0]
+    step = MICROS_PER_DAY // samples_per_day
+    wear = rng.uniform(0.01, 0.08, n_vehicles)
+    
+    root = tempfile.mkdtemp(prefix='telemetry-bench-')
+    store = TelemetryStore(root)
+    store.FLUSH_EVERY = 10_000_000
+    
+    total = 0
+    start = time.perf_counter()
+    for day in range(n_days):
+        for tick in range(samples_per_day):
+            t = origin + day * MICROS_PER_DAY + tick * step
+            elapsed_days = day + tick / samples_per_day
+            store.append_batch(ids, np.full(n_vehicles, t, dtype=np.int64), {
+                'brake_pad_thickness_mm': 10 - wear * elapsed_days + rng.normal(0, 0.05, n_vehicles),
+                'battery_voltage_v': 12.8 + rng.normal(0, 0.1, n_vehicles),
+                'coolant_temp_c': rng.normal(90, 5, n_vehicles),
+            })
+            total += n_vehicles
+        store.flush()
+    ingest_secs = time.perf_counter() - start
+    print(f"Ingest        : {ingest_secs:8.3f}s  ({total / ingest_secs:>12,.0f} rows/s, {len(store.chunks)} chunks)")
+    
+    # Cold reopen: manifest + vehicle dictionary only
+    start = time.perf_counter()
+    store = TelemetryStore(root)
+    print(f"Reopen        : {(time.perf_counter() - start) * 1e3:8.2f}ms")
+    
+    # Single-vehicle range queries (7-day windows at random offsets)
+    picks = rng.integers(0, n_vehicles, 200)
+    starts = origin + rng.integers(0, max(1, n_days - 7), 200) * MICROS_PER_DAY
+    start = time.perf_counter()
+    rows = 0
+    for vehicle, t0 in zip(picks, starts):
+        window = store.query(ids[vehicle], np.datetime64(int(t0), 'us'), np.datetime64(int(t0 + 7 * MICROS_PER_DAY), 'us'),
+                             ['brake_pad_thickness_mm'])
+        rows += len(window['time'])
+    query_secs = time.perf_counter() - start
+    print(f"Vehicle query : {query_secs / len(picks) * 1e3:8.3f}ms per 7-day window ({rows // len(picks)} rows)")
+    
+    # Zero-copy check: a one-day window lives in one chunk and shares its mmap buffer
+    one_day = store.query(ids[0], np.datetime64(int(origin), 'us'), np.datetime64(int(origin + MICROS_PER_DAY), 'us'))
+    print(f"Zero-copy     : {isinstance(one_day['time'].base, np.memmap) or isinstance(one_day['time'], np.memmap)}")
+    
+    # Fleet-wide window scan
+    start = time.perf_counter()
+    window = store.fleet_window(np.datetime64(int(origin), 'us'), np.datetime64(int(origin + 7 * MICROS_PER_DAY), 'us'),
+                                ['brake_pad_thickness_mm'])
+    scan_secs = time.perf_counter() - start
+    print(f"Fleet window  : {scan_secs:8.3f}s  ({len(window['time']):,} rows, {len(window['time']) / scan_secs:>12,.0f} rows/s)")
+    
+    # Chart queries: a fleet-wide series over the whole history, raw scan vs rollup tiers
+    end_us = store.latest_time() + 1
+    start_us = end_us - n_days * MICROS_PER_DAY
+    for points in (30, 720, 43_200):
+        start = time.perf_counter()
+        chart = store.series('brake_pad_thickness_mm', start_us, end_us, points=points)
+        chart_secs = time.perf_counter() - start
+        print(f"Series {points:>6} : {chart_secs * 1e3:8.2f}ms  tier={chart['tier']:>3}  rows read={chart['rows_read']:,}")
+    
+    start = time.perf_counter()
+    raw = store.fleet_window(start_us, end_us, ['brake_pad_thickness_mm'])
+    raw_secs = time.perf_counter() - start
+    print(f"Raw {n_days:>3} days  : {raw_secs * 1e3:8.2f}ms  rows read={len(raw['time']):,}")
+    
+    # Rollups must agree with aggregating the raw rows directly
+    daily = store.series('brake_pad_thickness_mm', start_us, end_us, points=n_days)['value']
+    slots = (raw['time'] - start_us) // MICROS_PER_DAY
+    expected = np.bincount(slots, raw['brake_pad_thickness_mm'], n_days) / np.bincount(slots, minlength=n_days)
+    print("Rollups match :", "YES" if np.allclose(daily, expected) else "NO")
+    
+    shutil.rmtree(root)
@@ -5,8 +5,18 @@ Security monitoring and threat detection system
 
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Tuple
-from datetime import datetime
-from collections import defaultdict
+from datetime import datetime, timedelta
+from collections import defaultdict, deque
+import json
+import math
+import os
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_PATH = os.path.join(BASE_DIR, 'data', 'ueba_snapshot.json')
+WAL_PATH = os.path.join(BASE_DIR, 'data', 'ueba_wal.jsonl')
+LEGACY_THREATS_PATH = os.path.join(BASE_DIR, 'data', 'ueba_threats.json')
 
 # User database
 USERS_DB = [
@@ -66,22 +76,379 @@ class SecurityThreat:
             'resolved': self.resolved
         }
 
+class RunningStats:
+    """
+    Streaming mean/variance accumulator (Welford) with an EWMA companion.
+    
+    Every update is O(1) and no samples are retained, so baselines can be
+    maintained for any number of events without rereading history.
+    """
+    
+    __slots__ = ('count', 'mean', 'm2', 'ewma', 'ewm_var', 'alpha')
+    
+    def __init__(self, alpha: float = 0.1):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma = 0.0
+        self.ewm_var = 0.0
+        self.alpha = alpha
+    
+    def update(self, value: float):
+        """Fold a new observation into the running statistics"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        
+        if self.count == 1:
+            self.ewma = value
+            self.ewm_var = 0.0
+        else:
+            ewm_delta = value - self.ewma
+            self.ewma += self.alpha * ewm_delta
+            self.ewm_var = (1 - self.alpha) * (self.ewm_var + self.alpha * ewm_delta * ewm_delta)
+    
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+    
+    def zscore(self, value: float) -> float:
+        """Z-score of value against the recent (EWMA) baseline"""
+        std = math.sqrt(self.ewm_var) if self.ewm_var > 0 else self.std
+        if self.count < 2 or std == 0:
+            return 0.0
+        return (value - self.ewma) / std
+    
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStats':
+        stats = cls()
+        for slot in cls.__slots__:
+            setattr(stats, slot, data.get(slot, getattr(stats, slot)))
+        return stats
+
+
+class UserBaseline:
+    """
+    Behavioral baseline for a single user.
+    
+    Tracks an hour-of-day histogram, the action mix and inter-event timing.
+    Histograms only ever grow, so the running maximum bucket is kept alongside
+    them and rarity can be scored in O(1).
+    """
+    
+    # Relative weight of each signal in the combined anomaly score
+    HOUR_WEIGHT = 0.35
+    ACTION_WEIGHT = 0.35
+    TIMING_WEIGHT = 0.30
+    
+    # Events needed before the baseline is fully trusted
+    WARMUP_EVENTS = 10
+    
+    # Inter-event gap z-score treated as fully anomalous
+    TIMING_Z_CAP = 3.0
+    
+    def __init__(self):
+        self.hour_counts: List[int] = [0] * 24
+        self.max_hour_count = 0
+        self.action_counts: Dict[str, int] = defaultdict(int)
+        self.max_action_count = 0
+        self.inter_event = RunningStats()
+        self.total_events = 0
+        self.last_event_ts: Optional[float] = None
+    
+    def score(self, action: str, when: datetime) -> float:
+        """
+        Score an event against the baseline (0.0 = typical, 1.0 = highly anomalous)
+        
+        Must be called before update() so the event is not part of its own baseline.
+        """
+        if self.total_events == 0:
+            return 0.0
+        
+        # Rarity relative to the user's most common hour/action (Laplace smoothed)
+        hour_rarity = 1 - (self.hour_counts[when.hour] + 1) / (self.max_hour_count + 1)
+        action_rarity = 1 - (self.action_counts.get(action, 0) + 1) / (self.max_action_count + 1)
+        
+        # Bursts (gaps much shorter than usual) are what we care about
+        timing_score = 0.0
+        if self.last_event_ts is not None and self.inter_event.count >= 2:
+            gap = max(when.timestamp() - self.last_event_ts, 0.0)
+            z = self.inter_event.zscore(math.log1p(gap))
+            timing_score = min(1.0, max(0.0, -z) / self.TIMING_Z_CAP)
+        
+        raw = (self.HOUR_WEIGHT * hour_rarity +
+               self.ACTION_WEIGHT * action_rarity +
+               self.TIMING_WEIGHT * timing_score)
+        
+        # Damp scores while the baseline is still warming up
+        confidence = self.total_events / (self.total_events + self.WARMUP_EVENTS)
+        
+        return round(raw * confidence, 4)
+    
+    def update(self, action: str, when: datetime):
+        """Fold an event into the baseline in O(1)"""
+        ts = when.timestamp()
+        
+        self.hour_counts[when.hour] += 1
+        self.max_hour_count = max(self.max_hour_count, self.hour_counts[when.hour])
+        
+        self.action_counts[action] += 1
+        self.max_action_count = max(self.max_action_count, self.action_counts[action])
+        
+        if self.last_event_ts is not None:
+            self.inter_event.update(math.log1p(max(ts - self.last_event_ts, 0.0)))
+        
+        self.last_event_ts = ts
+        self.total_events += 1
+    
+    def to_dict(self):
+        return {
+            'hour_counts': list(self.hour_counts),
+            'action_counts': dict(self.action_counts),
+            'inter_event': self.inter_event.to_dict(),
+            'total_events': self.total_events,
+            'last_event_ts': self.last_event_ts
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'UserBaseline':
+        baseline = cls()
+        baseline.hour_counts = list(data.get('hour_counts', baseline.hour_counts))
+        baseline.max_hour_count = max(baseline.hour_counts)
+        baseline.action_counts.update(data.get('action_counts', {}))
+        baseline.max_action_count = max(baseline.action_counts.values(), default=0)
+        baseline.inter_event = RunningStats.from_dict(data.get('inter_event', {}))
+        baseline.total_events = data.get('total_events', 0)
+        baseline.last_event_ts = data.get('last_event_ts')
+        return baseline
+
+
+class TokenBucket:
+    """Token bucket holding up to `capacity` tokens, refilled at `rate` tokens/second"""
+    
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+    
+    def __init__(self, capacity: float, rate: float, now: Optional[float] = None):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+    
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+    
+    def can_consume(self, cost: float, now: float) -> bool:
+        self.refill(now)
+        return self.tokens >= cost
+    
+    def consume(self, cost: float, now: float):
+        self.refill(now)
+        self.tokens -= cost
+
+
+class UEBAStateStore:
+    """
+    Durable UEBA state: a JSON snapshot plus an append-only write-ahead log.
+    
+    Every state change (new threat, block, unblock, resolve) is appended to the
+    WAL and fsynced before it is acknowledged. Once the WAL reaches
+    SNAPSHOT_EVERY records the full state is written to a new snapshot
+    (atomically, via rename) and the WAL is truncated, so a restore reads one
+    snapshot plus a bounded tail rather than every event ever logged.
+    
+    WAL records carry a sequence number and the snapshot records the last one it
+    includes, so a crash between the snapshot rename and the WAL truncation
+    cannot apply the same record twice.
+    """
+    
+    SNAPSHOT_EVERY = 500  # WAL records between snapshots
+    
+    def __init__(self, snapshot_path: str = SNAPSHOT_PATH, wal_path: str = WAL_PATH,
+                 legacy_threats_path: Optional[str] = LEGACY_THREATS_PATH, fsync: bool = True):
+        self.snapshot_path = snapshot_path
+        self.wal_path = wal_path
+        self.legacy_threats_path = legacy_threats_path
+        self.fsync = fsync
+        self.last_seq = 0
+        self.wal_records = 0
+        self._wal_file = None
+    
+    def load(self) -> Tuple[Optional[Dict], List[Dict]]:
+        """Read the snapshot (if any) and the WAL records written after it"""
+        snapshot = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+        
+        snapshot_seq = snapshot.get('last_seq', 0) if snapshot else 0
+        self.last_seq = snapshot_seq
+        
+        records = []
+        if os.path.exists(self.wal_path):
+            good_bytes = 0
+            with open(self.wal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("unterminated record")
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final write from a crash - everything before it is intact
+                        break
+                    good_bytes += len(line)
+                    if record.get('seq', 0) > snapshot_seq:
+                        records.append(record)
+                        self.last_seq = record['seq']
+            
+            # Cut the torn tail off so the next append starts on a fresh line
+            if good_bytes < os.path.getsize(self.wal_path):
+                with open(self.wal_path, 'r+b') as f:
+                    f.truncate(good_bytes)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+        
+        self.wal_records = len(records)
+        return snapshot, records
+    
+    def load_legacy_threats(self) -> List[Dict]:
+        """Read threats persisted by earlier versions in data/ueba_threats.json"""
+        if not self.legacy_threats_path or not os.path.exists(self.legacy_threats_path):
+            return []
+        try:
+            with open(self.legacy_threats_path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return []
+    
+    def append(self, op: str, **payload) -> bool:
+        """
+        Durably append a state change to the WAL
+        
+        Returns True when a snapshot is due.
+        """
+        self.last_seq += 1
+        record = {'seq': self.last_seq, 'op': op, **payload}
+        
+        if self._wal_file is None:
+            os.makedirs(os.path.dirname(self.wal_path), exist_ok=True)
+            self._wal_file = open(self.wal_path, 'a')
+        
+        self._wal_file.write(json.dumps(record) + '\n')
+        self._wal_file.flush()
+        if self.fsync:
+            os.fsync(self._wal_file.fileno())
+        
+        self.wal_records += 1
+        return self.wal_records >= self.SNAPSHOT_EVERY
+    
+    def write_snapshot(self, state: Dict):
+        """Atomically replace the snapshot, then truncate the WAL it supersedes"""
+        state = dict(state, last_seq=self.last_seq, saved_at=datetime.now().isoformat())
+        
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+        open(self.wal_path, 'w').close()
+        self.wal_records = 0
+    
+    def close(self):
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+
+
 class UEBA:
     """User & Entity Behavior Analytics"""
     
     # Threat detection thresholds
     RAPID_ACCESS_THRESHOLD = 5  # Actions within short time
     SUSPICIOUS_PATTERN_THRESHOLD = 3  # Unusual activities
+    RAPID_ACCESS_WINDOW = 60  # Seconds
+    FAILED_LOGIN_THRESHOLD = 3
+    FAILED_LOGIN_WINDOW = 300  # Seconds
+    
+    # Actions that touch critical systems
+    CRITICAL_ACTIONS = ['run_diagnostics', 'modify_vehicle', 'export_data']
+    
+    # Business hours (inclusive); anything outside is after-hours
+    BUSINESS_HOURS = (6, 22)
+    
+    # Rate limits as (burst capacity, refill tokens/second)
+    USER_RATE_LIMIT = (10, 0.2)
+    ROLE_RATE_LIMITS = {
+        'admin': (60, 1.0),
+        'fleet_manager': (40, 0.5),
+        'mechanic': (40, 0.5),
+        'external': (4, 0.02)
+    }
+    DEFAULT_ROLE_RATE_LIMIT = (20, 0.2)
+    
+    # Token cost per request; agent-graph runs are the expensive ones
+    ACTION_COSTS = {
+        'run_diagnostics': 2,
+        'chat_message': 1,
+        'export_data': 3
+    }
     
     # Suspicious patterns
     SUSPICIOUS_ROLES = ['external', 'contractor']
     HIGH_RISK_ACTIONS = ['delete', 'export', 'modify_critical']
     
-    def __init__(self):
+    # Number of locks guarding per-user state
+    LOCK_STRIPES = 64
+    
+    def __init__(self, store: Optional[UEBAStateStore] = None):
         self.activity_log: List[Dict] = []
         self.threats: List[SecurityThreat] = []
         self.blocked_users: set = set()
         self.threat_id_counter = 1
+        self.baselines: Dict[str, UserBaseline] = {}
+        self.latest_scores: Dict[str, float] = {}
+        
+        # Per-user sliding windows (event timestamps), trimmed on every append so
+        # the rule checks read their counts in O(1)
+        self.recent_activity: Dict[str, deque] = defaultdict(deque)
+        self.recent_failed_logins: Dict[str, deque] = defaultdict(deque)
+        
+        # Request admission control (per-user and per-role token buckets)
+        self.user_buckets: Dict[str, TokenBucket] = {}
+        self.role_buckets: Dict[str, TokenBucket] = {}
+        self.request_stats: Dict[str, Dict[str, int]] = {}
+        
+        # Concurrency: per-user state (baselines, recent activity, buckets, request
+        # stats) is guarded by one of LOCK_STRIPES locks chosen by user_id, so
+        # different users rarely contend. Shared threat/block state and the WAL
+        # sit behind _state_lock; threat IDs come from _id_lock.
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._role_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._state_lock = threading.RLock()
+        self._id_lock = threading.Lock()
+        
+        # Optional durable store; in-memory only when None
+        self.store = store
+        if self.store is not None:
+            self._restore()
     
     def authenticate_user(self, email: str, password: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """
@@ -112,31 +479,46 @@ class UEBA:
         # Successful authentication
         return True, user, None
     
-    def log_activity(self, user_id: str, action: str, metadata: Dict) -> Optional[SecurityThreat]:
+    def log_activity(self, user_id: str, action: str, metadata: Dict,
+                     timestamp: Optional[datetime] = None) -> Optional[SecurityThreat]:
         """
         Log user activity and check for threats
         
+        timestamp defaults to now; pass it explicitly when replaying a historical log.
         Returns threat object if detected, None otherwise
         """
-        activity = {
-            'user_id': user_id,
-            'action': action,
-            'metadata': metadata,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        self.activity_log.append(activity)
+        now = timestamp or datetime.now()
         
-        # Analyze for threats
-        threat = self._analyze_activity(user_id, action, metadata)
+        with self._user_lock(user_id):
+            activity = {
+                'user_id': user_id,
+                'action': action,
+                'metadata': metadata,
+                'timestamp': now.isoformat(),
+                'anomaly_score': self._update_baseline(user_id, action, now)
+            }
+            
+            self.activity_log.append(activity)
+            self._track_recent(user_id, action, now)
+            
+            # Analyze for threats
+            threat = self._analyze_activity(user_id, action, metadata, now)
         
         if threat:
-            self.threats.append(threat)
+            with self._state_lock:
+                self.threats.append(threat)
+                self._persist('threat', threat=threat.to_dict())
         
         return threat
     
-    def _analyze_activity(self, user_id: str, action: str, metadata: Dict) -> Optional[SecurityThreat]:
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        """Stripe lock guarding a user's state"""
+        return self._stripes[hash(user_id) % self.LOCK_STRIPES]
+    
+    def _analyze_activity(self, user_id: str, action: str, metadata: Dict,
+                          when: Optional[datetime] = None) -> Optional[SecurityThreat]:
         """Analyze activity for security threats"""
+        when = when or datetime.now()
         
         # Get user info
         user = next((u for u in USERS_DB if u['user_id'] == user_id), None)
@@ -146,73 +528,169 @@ class UEBA:
         # Check 1: Suspicious role
         if user['role'] in self.SUSPICIOUS_ROLES:
             # External users accessing critical systems
-            if action in ['run_diagnostics', 'modify_vehicle', 'export_data']:
+            if action in self.CRITICAL_ACTIONS:
                 return SecurityThreat(
                     threat_id=self._get_next_threat_id(),
                     user_id=user_id,
                     threat_type='Unauthorized Access',
                     severity='High',
                     details=f"External user {user_id} attempting {action}",
-                    timestamp=datetime.now().isoformat()
+                    timestamp=when.isoformat()
                 )
         
         # Check 2: Rapid successive actions (potential bot/script)
-        recent_actions = self._get_recent_actions(user_id, seconds=60)
-        if len(recent_actions) >= self.RAPID_ACCESS_THRESHOLD:
+        recent_count = len(self.recent_activity[user_id])
+        if recent_count >= self.RAPID_ACCESS_THRESHOLD:
             return SecurityThreat(
                 threat_id=self._get_next_threat_id(),
                 user_id=user_id,
                 threat_type='Rapid Access Pattern',
                 severity='Medium',
-                details=f"User {user_id} performed {len(recent_actions)} actions in 60 seconds",
-                timestamp=datetime.now().isoformat()
+                details=f"User {user_id} performed {recent_count} actions in {self.RAPID_ACCESS_WINDOW} seconds",
+                timestamp=when.isoformat()
             )
         
         # Check 3: After-hours access
-        current_hour = datetime.now().hour
-        if current_hour < 6 or current_hour > 22:
-            if action in ['run_diagnostics', 'export_data', 'modify_vehicle']:
+        current_hour = when.hour
+        if current_hour < self.BUSINESS_HOURS[0] or current_hour > self.BUSINESS_HOURS[1]:
+            if action in self.CRITICAL_ACTIONS:
                 return SecurityThreat(
                     threat_id=self._get_next_threat_id(),
                     user_id=user_id,
                     threat_type='After-Hours Access',
                     severity='Low',
                     details=f"User {user_id} accessing system at unusual hour: {current_hour}:00",
-                    timestamp=datetime.now().isoformat()
+                    timestamp=when.isoformat()
                 )
         
         # Check 4: Multiple failed login attempts
         if action == 'failed_login':
-            failed_logins = [a for a in self._get_recent_actions(user_id, seconds=300) 
-                           if a['action'] == 'failed_login']
-            if len(failed_logins) >= 3:
+            if len(self.recent_failed_logins[user_id]) >= self.FAILED_LOGIN_THRESHOLD:
                 return SecurityThreat(
                     threat_id=self._get_next_threat_id(),
                     user_id=user_id,
                     threat_type='Brute Force Attempt',
                     severity='Critical',
                     details=f"Multiple failed login attempts detected for {user_id}",
-                    timestamp=datetime.now().isoformat()
+                    timestamp=when.isoformat()
                 )
         
         return None
     
-    def _get_recent_actions(self, user_id: str, seconds: int = 60) -> List[Dict]:
-        """Get recent actions for a user within specified time window"""
-        # Simplified - just return last N actions
-        # In production, would use proper time-based filtering
-        user_actions = [a for a in self.activity_log if a['user_id'] == user_id]
-        return user_actions[-10:]  # Return last 10 actions as proxy
+    def allow_request(self, user_id: str, action: str) -> bool:
+        """
+        Admission check to run before an expensive pipeline (agent graph, chat)
+        
+        Rejects blocked users and requests over the user's or role's token bucket.
+        Rejections only bump counters, so a scripted client is shed in O(1)
+        without logging or analyzing anything.
+        """
+        cost = self.ACTION_COSTS.get(action, 1)
+        user = next((u for u in USERS_DB if u['user_id'] == user_id), None)
+        role = user['role'] if user else 'unknown'
+        
+        # Lock order is always user stripe -> role lock
+        with self._user_lock(user_id):
+            stats = self.request_stats.get(user_id)
+            if stats is None:
+                stats = self.request_stats[user_id] = defaultdict(int)
+            
+            if user_id in self.blocked_users:
+                stats['blocked'] += 1
+                return False
+            
+            now = time.monotonic()
+            user_bucket = self.user_buckets.get(user_id)
+            if user_bucket is None:
+                user_bucket = self.user_buckets[user_id] = TokenBucket(*self.USER_RATE_LIMIT, now=now)
+            
+            if not user_bucket.can_consume(cost, now):
+                stats['user_limit'] += 1
+                return False
+            
+            with self._role_locks[role]:
+                role_bucket = self.role_buckets.get(role)
+                if role_bucket is None:
+                    limit = self.ROLE_RATE_LIMITS.get(role, self.DEFAULT_ROLE_RATE_LIMIT)
+                    role_bucket = self.role_buckets[role] = TokenBucket(*limit, now=now)
+                
+                # Checked before consuming so a role rejection doesn't drain the user bucket
+                if not role_bucket.can_consume(cost, now):
+                    stats['role_limit'] += 1
+                    return False
+                role_bucket.consume(cost, now)
+            
+            user_bucket.consume(cost, now)
+            stats['allowed'] += 1
+            return True
+    
+    def get_rate_limit_stats(self) -> Dict:
+        """Admission counters for the rate limiter"""
+        shed_by_reason = defaultdict(int)
+        shed_by_user = {}
+        allowed = 0
+        
+        for user_id, stats in list(self.request_stats.items()):
+            stats = dict(stats)
+            allowed += stats.pop('allowed', 0)
+            for reason, count in stats.items():
+                shed_by_reason[reason] += count
+            if stats:
+                shed_by_user[user_id] = sum(stats.values())
+        
+        return {
+            'allowed': allowed,
+            'shed': sum(shed_by_reason.values()),
+            'shed_by_reason': dict(shed_by_reason),
+            'shed_by_user': shed_by_user
+        }
+    
+    def _track_recent(self, user_id: str, action: str, when: datetime):
+        """Append to the user's sliding windows and drop entries that fell out of them"""
+        self._slide(self.recent_activity[user_id], when, self.RAPID_ACCESS_WINDOW)
+        if action == 'failed_login':
+            self._slide(self.recent_failed_logins[user_id], when, self.FAILED_LOGIN_WINDOW)
+    
+    @staticmethod
+    def _slide(window: deque, when: datetime, seconds: int):
+        window.append(when)
+        horizon = when - timedelta(seconds=seconds)
+        while window[0] < horizon:
+            window.popleft()
+    
+    def _update_baseline(self, user_id: str, action: str, when: datetime) -> float:
+        """Score the event against the user's baseline, then fold it in"""
+        baseline = self.baselines.get(user_id)
+        if baseline is None:
+            baseline = self.baselines[user_id] = UserBaseline()
+        
+        score = baseline.score(action, when)
+        baseline.update(action, when)
+        self.latest_scores[user_id] = score
+        return score
+    
+    def get_anomaly_score(self, user_id: str = None) -> float:
+        """Latest anomaly score for a user, or the highest current score across users"""
+        if user_id is not None:
+            return self.latest_scores.get(user_id, 0.0)
+        return max(self.latest_scores.values(), default=0.0)
+    
+    def get_anomaly_timeline(self, limit: int = 60) -> List[float]:
+        """Anomaly scores of the most recent events, oldest first"""
+        return [a.get('anomaly_score', 0.0) for a in self.activity_log[-limit:]]
     
     def _get_next_threat_id(self) -> int:
         """Get next threat ID"""
-        threat_id = self.threat_id_counter
-        self.threat_id_counter += 1
+        with self._id_lock:
+            threat_id = self.threat_id_counter
+            self.threat_id_counter += 1
         return threat_id
     
     def block_user(self, user_id: str):
         """Block a user from accessing the system"""
-        self.blocked_users.add(user_id)
+        with self._state_lock:
+            self.blocked_users.add(user_id)
+            self._persist('block', user_id=user_id)
         
         # Log the blocking action
         self.log_activity(
@@ -223,8 +701,10 @@ class UEBA:
     
     def unblock_user(self, user_id: str):
         """Unblock a user"""
-        if user_id in self.blocked_users:
-            self.blocked_users.remove(user_id)
+        with self._state_lock:
+            if user_id in self.blocked_users:
+                self.blocked_users.remove(user_id)
+                self._persist('unblock', user_id=user_id)
     
     def is_user_blocked(self, user_id: str) -> bool:
         """Check if user is blocked"""
@@ -232,27 +712,35 @@ class UEBA:
     
     def resolve_threat(self, threat_id: int):
         """Mark a threat as resolved"""
-        for threat in self.threats:
-            if threat.threat_id == threat_id:
-                threat.resolved = True
-                break
+        with self._state_lock:
+            for threat in self.threats:
+                if threat.threat_id == threat_id:
+                    threat.resolved = True
+                    self._persist('resolve', threat_id=threat_id)
+                    break
     
     def get_active_threats(self) -> List[SecurityThreat]:
         """Get all unresolved threats"""
-        return [t for t in self.threats if not t.resolved]
+        with self._state_lock:
+            return [t for t in self.threats if not t.resolved]
     
     def get_threats_by_user(self, user_id: str) -> List[SecurityThreat]:
         """Get threats for a specific user"""
-        return [t for t in self.threats if t.user_id == user_id]
+        with self._state_lock:
+            return [t for t in self.threats if t.user_id == user_id]
     
     def get_threat_summary(self) -> Dict:
         """Get summary statistics of threats"""
-        active_threats = self.get_active_threats()
+        with self._state_lock:
+            active_threats = self.get_active_threats()
+            total_threats = len(self.threats)
+            blocked_users = len(self.blocked_users)
         
         summary = {
-            'total_threats': len(self.threats),
+            'total_threats': total_threats,
             'total_active_threats': len(active_threats),
-            'blocked_users': len(self.blocked_users),
+            'blocked_users': blocked_users,
+            'shed_requests': self.get_rate_limit_stats()['shed'],
             'by_severity': defaultdict(int),
             'by_type': defaultdict(int)
         }
@@ -284,6 +772,84 @@ class UEBA:
     def get_all_users(self) -> List[Dict]:
         """Get all users (for admin purposes)"""
         return USERS_DB.copy()
+    
+    # --- Persistence ---
+    
+    def _persist(self, op: str, **payload):
+        """Write a state change to the store and snapshot when the WAL is full"""
+        if self.store is None:
+            return
+        with self._state_lock:
+            if self.store.append(op, **payload):
+                self.snapshot()
+    
+    def snapshot(self):
+        """Write the full state to the store's snapshot"""
+        if self.store is not None:
+            with self._state_lock:
+                self.store.write_snapshot(self._export_state())
+    
+    def _export_state(self) -> Dict:
+        return {
+            'threats': [t.to_dict() for t in self.threats],
+            'blocked_users': sorted(self.blocked_users),
+            'threat_id_counter': self.threat_id_counter,
+            'baselines': {user_id: b.to_dict() for user_id, b in list(self.baselines.items())}
+        }
+    
+    def _restore(self):
+        """Rebuild state from snapshot + WAL tail (or legacy threats on first run)"""
+        snapshot, records = self.store.load()
+        
+        if snapshot is None and not records:
+            self._import_legacy_threats(self.store.load_legacy_threats())
+            return
+        
+        if snapshot:
+            self.threats = [SecurityThreat(**t) for t in snapshot.get('threats', [])]
+            self.blocked_users = set(snapshot.get('blocked_users', []))
+            self.threat_id_counter = snapshot.get('threat_id_counter', 1)
+            self.baselines = {
+                user_id: UserBaseline.from_dict(data)
+                for user_id, data in snapshot.get('baselines', {}).items()
+            }
+        
+        threats_by_id = {t.threat_id: t for t in self.threats}
+        for record in records:
+            op = record['op']
+            if op == 'threat':
+                threat = SecurityThreat(**record['threat'])
+                self.threats.append(threat)
+                threats_by_id[threat.threat_id] = threat
+                self.threat_id_counter = max(self.threat_id_counter, threat.threat_id + 1)
+            elif op == 'block':
+                self.blocked_users.add(record['user_id'])
+            elif op == 'unblock':
+                self.blocked_users.discard(record['user_id'])
+            elif op == 'resolve' and record['threat_id'] in threats_by_id:
+                threats_by_id[record['threat_id']].resolved = True
+    
+    def _import_legacy_threats(self, legacy: List[Dict]):
+        """Seed state from data/ueba_threats.json and snapshot it"""
+        if not legacy:
+            return
+        
+        for item in legacy:
+            details = item.get('details', '')
+            if isinstance(details, dict):
+                details = details.get('message', json.dumps(details))
+            
+            self.threats.append(SecurityThreat(
+                threat_id=self._get_next_threat_id(),
+                user_id=item.get('user_id', 'Unknown'),
+                threat_type=item.get('threat_type', 'Unknown').replace('_', ' ').title(),
+                severity=item.get('severity', 'Medium'),
+                details=details,
+                timestamp=item.get('timestamp', datetime.now().isoformat()),
+                resolved=item.get('status', 'active') != 'active'
+            ))
+        
+        self.snapshot()
 
 # Singleton instance
 _ueba_instance = None
@@ -292,5 +858,68 @@ def get_ueba():
     """Get or create UEBA instance"""
     global _ueba_instance
     if _ueba_instance is None:
-        _ueba_instance = UEBA()
+        _ueba_instance = UEBA(store=UEBAStateStore())
     return _ueba_instance
+
+# --- STRESS TEST RUNNER (Only runs if you execute this file directly) ---
+if __name__ == "__main__":
+    import sys
+    
+    n_threads = 32
+    events_per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    
+    ueba = UEBA()
+    user_ids = [u['user_id'] for u in USERS_DB]
+    actions = ['view_dashboard', 'run_diagnostics', 'failed_login', 'export_data']
+    start_barrier = threading.Barrier(n_threads + 1)
+    
+    def worker(idx: int):
+        # Threads share the real users (so stripes do contend) plus one private user each
+        own_user = f"LOAD-{idx:02d}"
+        start_barrier.wait()
+        for i in range(events_per_thread):
+            user_id = user_ids[(idx + i) % len(user_ids)] if i % 2 else own_user
+            ueba.log_activity(user_id, actions[i % len(actions)], {"worker": idx})
+            ueba.allow_request(user_id, actions[i % len(actions)])
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    
+    total_events = n_threads * events_per_thread
+    threat_ids = [t.threat_id for t in ueba.threats]
+    
+    print(f"=== UEBA STRESS TEST: {n_threads} threads x {events_per_thread:,} events ===")
+    print(f"Events logged   : {len(ueba.activity_log):,} / {total_events:,}")
+    print(f"Threats raised  : {len(threat_ids):,}")
+    print(f"Unique IDs      : {'YES' if len(set(threat_ids)) == len(threat_ids) else 'NO - DUPLICATES FOUND'}")
+    print(f"Contiguous IDs  : {'YES' if sorted(threat_ids) == list(range(1, len(threat_ids) + 1)) else 'NO'}")
+    print(f"Rate limiter    : {ueba.get_rate_limit_stats()['allowed']:,} admitted, {ueba.get_rate_limit_stats()['shed']:,} shed")
+    print(f"Throughput      : {total_events / elapsed:,.0f} events/s ({elapsed:.2f}s)")
+    
+    # Crash recovery: a torn final WAL line must not swallow the next record appended after restart
+    import tempfile
+    crash_dir = tempfile.mkdtemp(prefix='ueba-wal-')
+    wal_path = os.path.join(crash_dir, 'ueba_wal.jsonl')
+    
+    def crash_store() -> UEBAStateStore:
+        return UEBAStateStore(os.path.join(crash_dir, 'ueba_snapshot.json'), wal_path,
+                              legacy_threats_path=None, fsync=False)
+    
+    before_crash = UEBA(crash_store())
+    before_crash.block_user('U001')
+    before_crash.store.close()
+    with open(wal_path, 'a') as f:
+        f.write('{"seq": 2, "op": "blo')  # Power lost mid-write
+    
+    after_crash = UEBA(crash_store())
+    after_crash.block_user('U004')
+    after_crash.store.close()
+    
+    recovered = UEBA(crash_store()).blocked_users
+    print(f"Torn WAL tail   : {'RECOVERED' if recovered == {'U001', 'U004'} else f'LOST RECORDS - {sorted(recovered)}'}")